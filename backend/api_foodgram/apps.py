@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.core.signals import request_started
 
 
 class ApiFoodgramConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api_foodgram'
+
+    def ready(self):
+        from . import authentication, cache  # noqa: F401
+        from .db import check_connections
+
+        request_started.connect(check_connections)
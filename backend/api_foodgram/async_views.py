@@ -0,0 +1,60 @@
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from django.urls import URLPattern
+from rest_framework import permissions
+
+# Маршруты, чтение которых обслуживается асинхронно.
+ASYNC_URL_NAMES = (
+    'recipes-list', 'recipes-detail',
+    'tags-list', 'tags-detail',
+    'ingredients-list', 'ingredients-detail',
+    'subscriptions',
+)
+
+
+def run_view(view, request, *args, **kwargs):
+    """Вызывает синхронное представление в потоке из пула."""
+    try:
+        response = view(request, *args, **kwargs)
+        if hasattr(response, 'render'):
+            response.render()
+        return response
+    finally:
+        close_old_connections()
+
+
+def async_view(view):
+    """
+    Асинхронная обёртка над DRF-представлением.
+    Безопасные запросы выполняются в пуле потоков со своими
+    соединениями с БД, поэтому под ASGI один воркер обслуживает
+    много одновременных клиентов. Остальные запросы идут
+    в основной поток, как у обычных синхронных представлений.
+    """
+
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method in permissions.SAFE_METHODS:
+            return await sync_to_async(run_view, thread_sensitive=False)(
+                view, request, *args, **kwargs
+            )
+        return await sync_to_async(view, thread_sensitive=True)(
+            request, *args, **kwargs
+        )
+
+    return wrapper
+
+
+def async_urls(urls):
+    """Заменяет представления из ASYNC_URL_NAMES асинхронными обёртками."""
+    return [
+        URLPattern(
+            url.pattern, async_view(url.callback),
+            url.default_args, url.name,
+        )
+        if isinstance(url, URLPattern) and url.name in ASYNC_URL_NAMES
+        else url
+        for url in urls
+    ]
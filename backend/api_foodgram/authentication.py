@@ -0,0 +1,52 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from users.models import User
+
+from .instrumentation import current_metrics
+
+
+def get_token_key(key):
+    # В ключе кеша хранится хеш, а не сам токен.
+    return 'auth-token:' + hashlib.sha256(key.encode()).hexdigest()
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Аутентификация по токену с кешированием пользователя
+    на AUTH_TOKEN_CACHE_TIMEOUT секунд.
+    """
+
+    def authenticate_credentials(self, key):
+        cache_key = get_token_key(key)
+        token = cache.get(cache_key)
+        metrics = current_metrics.get()
+        if metrics is not None:
+            metrics.counters[
+                'auth_cache_misses' if token is None else 'auth_cache_hits'
+            ] += 1
+        if token is None:
+            _, token = super().authenticate_credentials(key)
+            # Токен сохраняется вместе с загруженным пользователем.
+            cache.set(cache_key, token, settings.AUTH_TOKEN_CACHE_TIMEOUT)
+        return token.user, token
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    cache.delete(get_token_key(instance.key))
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance, created, update_fields, **kwargs):
+    # Вход обновляет только last_login, сбрасывать кеш не нужно.
+    if created or update_fields and set(update_fields) <= {'last_login'}:
+        return
+    keys = Token.objects.filter(user=instance).values_list('key', flat=True)
+    cache.delete_many([get_token_key(key) for key in keys])
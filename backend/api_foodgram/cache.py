@@ -0,0 +1,153 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Prefetch
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from django.http import Http404
+
+from recipes.models import Ingredient, IngredientAmount, Recipe, Tag
+from users.models import User
+
+# Поля автора, которые попадают в ответ с рецептом.
+AUTHOR_FIELDS = {'email', 'username', 'first_name', 'last_name'}
+# Версия, общая для всех рецептов.
+ALL_RECIPES = '*'
+# Кеши, которые не видны другим процессам.
+PROCESS_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+RECIPE_PREFETCH = (
+    'tags',
+    Prefetch(
+        'am_ingredients',
+        queryset=IngredientAmount.objects.select_related('ingredients'),
+    ),
+)
+RECIPE_QUERYSET = Recipe.objects.select_related('author').prefetch_related(
+    *RECIPE_PREFETCH
+)
+
+
+def is_cache_shared():
+    """Видят ли записи в кеш все воркеры, а не только записавший."""
+    return settings.CACHES['default']['BACKEND'] not in PROCESS_CACHES
+
+
+def get_profile_key(user_id):
+    return f'user-profile:{user_id}'
+
+
+def get_version_key(recipe_id):
+    return f'recipe-version:{recipe_id}'
+
+
+def get_recipe_key(recipe_id, version, graph_version):
+    return f'recipe:{recipe_id}:{version}:{graph_version}'
+
+
+def load_recipe(recipe_id):
+    recipe = RECIPE_QUERYSET.using('default').filter(pk=recipe_id).first()
+    if recipe is None:
+        raise Http404
+    return recipe
+
+
+def get_cached_recipe(recipe_id):
+    """
+    Рецепт с автором, тегами и ингредиентами.
+    Хранится в кеше по id и версии, версия меняется после фиксации
+    записи. Рецепт читается из основной БД: с отстающей реплики
+    под новую версию попал бы прежний рецепт. С кешем одного процесса
+    другие воркеры не узнали бы о новой версии, поэтому он не используется.
+    """
+    try:
+        recipe_id = int(recipe_id)
+    except (TypeError, ValueError):
+        raise Http404
+    if not is_cache_shared():
+        return load_recipe(recipe_id)
+    versions = cache.get_many(
+        (get_version_key(recipe_id), get_version_key(ALL_RECIPES))
+    )
+    key = get_recipe_key(
+        recipe_id,
+        versions.get(get_version_key(recipe_id), 0),
+        versions.get(get_version_key(ALL_RECIPES), 0),
+    )
+    recipe = cache.get(key)
+    if recipe is None:
+        recipe = load_recipe(recipe_id)
+        cache.set(key, recipe, settings.RECIPE_CACHE_TIMEOUT)
+    return recipe
+
+
+def invalidate_recipes(*recipe_ids):
+    """
+    Меняет версию рецептов после фиксации транзакции. Если сменить
+    её раньше, параллельный запрос прочитает рецепт до изменения
+    и сохранит его в кеше под новой версией.
+    """
+    def bump():
+        version = time.time_ns()
+        cache.set_many(
+            {get_version_key(recipe_id): version for recipe_id in recipe_ids},
+            None,
+        )
+
+    transaction.on_commit(bump)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def recipe_changed(sender, instance, **kwargs):
+    invalidate_recipes(instance.id)
+
+
+@receiver(post_save, sender=IngredientAmount)
+@receiver(post_delete, sender=IngredientAmount)
+def recipe_ingredients_changed(sender, instance, **kwargs):
+    invalidate_recipes(instance.recipe_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if not reverse:
+        invalidate_recipes(instance.id)
+    elif pk_set:
+        invalidate_recipes(*pk_set)
+    else:
+        invalidate_recipes(ALL_RECIPES)
+
+
+@receiver(post_save, sender=User)
+def author_changed(sender, instance, created, update_fields, **kwargs):
+    if created or update_fields and not AUTHOR_FIELDS & set(update_fields):
+        return
+    recipe_ids = instance.recipes.values_list('id', flat=True)
+    if recipe_ids:
+        invalidate_recipes(*recipe_ids)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def profile_changed(sender, instance, update_fields=None, **kwargs):
+    if update_fields and not AUTHOR_FIELDS & set(update_fields):
+        return
+    cache.delete(get_profile_key(instance.id))
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def dictionary_changed(sender, **kwargs):
+    # Теги и ингредиенты меняет только администратор,
+    # поэтому сбрасываются сразу все рецепты.
+    invalidate_recipes(ALL_RECIPES)
@@ -0,0 +1,59 @@
+from django.http import Http404
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from recipes.models import Recipe
+from .cache import RECIPE_QUERYSET
+
+
+class PreconditionFailed(APIException):
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = 'Рецепт был изменён, загрузите его заново.'
+    default_code = 'precondition_failed'
+
+
+def get_etag(recipe):
+    return f'"{recipe.id}-{recipe.version}"'
+
+
+def get_if_match_versions(request, recipe_id):
+    """
+    Версии рецепта из заголовка If-Match, None - без условия.
+    Слабые ETag и ETag других рецептов не совпадают ни с чем.
+    """
+    header = request.headers.get('If-Match')
+    if header is None or header.strip() == '*':
+        return None
+    prefix = f'"{recipe_id}-'
+    versions = set()
+    for etag in header.split(','):
+        etag = etag.strip()
+        version = etag[len(prefix):-1]
+        if etag[:len(prefix)] == prefix and etag[-1:] == '"' and (
+            version.isdigit()
+        ):
+            versions.add(int(version))
+    return versions
+
+
+def lock_version(recipe, versions=None):
+    """
+    Занимает следующую версию рецепта условным UPDATE по текущей.
+    Если рецепт из кеша устарел, он загружается из БД заново.
+    Возвращает рецепт с новой версией, который нужно сохранить.
+    """
+    if versions is None or recipe.version in versions:
+        if Recipe.objects.filter(
+            pk=recipe.pk, version=recipe.version,
+        ).update(version=recipe.version + 1):
+            recipe.version += 1
+            return recipe
+    recipe = RECIPE_QUERYSET.select_for_update(of=('self',)).filter(
+        pk=recipe.pk,
+    ).first()
+    if recipe is None:
+        raise Http404
+    if versions is not None and recipe.version not in versions:
+        raise PreconditionFailed
+    recipe.version += 1
+    return recipe
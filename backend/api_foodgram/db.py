@@ -0,0 +1,71 @@
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+
+
+def check_connections(**kwargs):
+    """
+    Закрывает оборвавшиеся постоянные соединения с БД
+    перед обработкой запроса (аналог CONN_HEALTH_CHECKS из Django 4.1).
+    """
+    for connection in connections.all():
+        if (
+            connection.connection is not None
+            and connection.settings_dict.get('CONN_HEALTH_CHECKS')
+            and not connection.is_usable()
+        ):
+            connection.close()
+
+
+# Разрешено ли читать с реплики в текущем запросе.
+use_replica = ContextVar('use_replica', default=False)
+
+
+class ReplicaRouter:
+    """
+    Направляет чтение в безопасных запросах на реплики из
+    DATABASE_REPLICAS, запись и остальное чтение - в основную БД.
+    Токены всегда читаются из основной БД, чтобы только что
+    выданный токен сразу работал. Связанные объекты читаются
+    из той же БД, что и объект, от которого к ним перешли.
+    """
+    primary_apps = ('authtoken',)
+
+    def db_for_read(self, model, **hints):
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        if (
+            settings.DATABASE_REPLICAS
+            and use_replica.get()
+            and model._meta.app_label not in self.primary_apps
+        ):
+            return random.choice(settings.DATABASE_REPLICAS)
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
+
+
+def route_like_request(iterator):
+    """
+    Итератор, который читает из тех же БД, что и текущий запрос.
+    Тело потокового ответа перебирается уже после выхода из middleware.
+    """
+    return _route(iterator, use_replica.get())
+
+
+def _route(iterator, replica):
+    token = use_replica.set(replica)
+    try:
+        yield from iterator
+    finally:
+        use_replica.reset(token)
@@ -0,0 +1,82 @@
+import hashlib
+from functools import lru_cache
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.http import FileResponse, HttpResponse
+
+SHOPPING_LIST_DIR = 'shopping_lists'
+
+
+@lru_cache(maxsize=None)
+def register_fonts():
+    """Загружает шрифт один раз на процесс."""
+    # reportlab нужен только для списка покупок, не при запуске.
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+
+    pdfmetrics.registerFont(TTFont(
+        'Lato-Light', f'{settings.BASE_DIR}/data/lato-light.ttf', 'UTF-8'
+    ))
+
+
+def draw_shopping_list(ingredients, file):
+    """Рисует PDF со списком покупок в файл."""
+    from reportlab.pdfgen import canvas
+
+    register_fonts()
+    page = canvas.Canvas(file)
+    page.setFont("Lato-Light", 15)
+
+    indent = 800
+    for _, ingredient in enumerate(ingredients, start=1):
+        page.drawString(
+            50, indent, (f'{ingredient[0]}: '
+                         f'{ingredient[2]} '
+                         f'{ingredient[1]}')
+        )
+        indent -= 20
+
+    page.showPage()
+    page.save()
+
+
+def get_shopping_list(ingredients):
+    """
+    Имя PDF-файла со списком покупок в MEDIA_ROOT.
+    Имя - хеш списка, поэтому одинаковый список рисуется один раз.
+    """
+    ingredients = list(ingredients)
+    digest = hashlib.sha256(repr(ingredients).encode()).hexdigest()
+    name = f'{SHOPPING_LIST_DIR}/{digest}.pdf'
+    if not default_storage.exists(name):
+        file = BytesIO()
+        draw_shopping_list(ingredients, file)
+        name = default_storage.save(name, ContentFile(file.getvalue()))
+    return name
+
+
+def protected_file_response(name, filename, content_type):
+    """
+    Ответ с файлом из MEDIA_ROOT, закрытым от прямого доступа.
+    Если задан PROTECTED_MEDIA_URL, файл отдаёт nginx
+    по заголовку X-Accel-Redirect.
+    """
+    if settings.PROTECTED_MEDIA_URL:
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = settings.PROTECTED_MEDIA_URL + name
+    else:
+        response = FileResponse(
+            default_storage.open(name), content_type=content_type,
+        )
+    response['Content-Disposition'] = f'attachment;filename="{filename}"'
+    return response
+
+
+def shopping_list_response(ingredients, filename):
+    """PDF со списком покупок из (название, единица, количество)."""
+    return protected_file_response(
+        get_shopping_list(ingredients), filename, 'application/pdf',
+    )
@@ -0,0 +1,94 @@
+from itertools import groupby
+
+from django.conf import settings
+
+from recipes.models import FeedItem, Recipe
+from users.models import Follow
+from .cache import RECIPE_QUERYSET
+
+BATCH_SIZE = 1000
+
+
+def inbox_enabled():
+    return settings.FEED_STRATEGY == 'inbox'
+
+
+def get_feed(user):
+    """Записи ленты пользователя, пагинация по pub_date."""
+    if inbox_enabled():
+        return FeedItem.objects.filter(user=user).only('recipe_id', 'pub_date')
+    return RECIPE_QUERYSET.filter(author__author__follower=user)
+
+
+def get_page_recipes(page):
+    """Рецепты для страницы ленты в порядке записей."""
+    if not inbox_enabled():
+        return page
+    recipes = RECIPE_QUERYSET.in_bulk([item.recipe_id for item in page])
+    return [
+        recipes[item.recipe_id] for item in page if item.recipe_id in recipes
+    ]
+
+
+def fan_out_recipe(recipe):
+    """Добавляет новый рецепт в ленты подписчиков автора."""
+    if not inbox_enabled():
+        return
+    follower_ids = Follow.objects.filter(
+        author_id=recipe.author_id,
+    ).values_list('follower_id', flat=True)
+    FeedItem.objects.bulk_create(
+        (
+            FeedItem(
+                user_id=follower_id, recipe_id=recipe.id,
+                pub_date=recipe.pub_date,
+            )
+            for follower_id in follower_ids.iterator()
+        ),
+        batch_size=BATCH_SIZE, ignore_conflicts=True,
+    )
+
+
+def get_latest_recipes(author_id):
+    return Recipe.objects.filter(author_id=author_id).order_by(
+        '-pub_date',
+    ).values_list('id', 'pub_date')[:settings.FEED_BACKFILL]
+
+
+def add_author(follower_id, author_id):
+    """Добавляет в ленту последние FEED_BACKFILL рецептов автора."""
+    if not inbox_enabled():
+        return
+    FeedItem.objects.bulk_create(
+        (
+            FeedItem(user_id=follower_id, recipe_id=recipe_id, pub_date=date)
+            for recipe_id, date in get_latest_recipes(author_id)
+        ),
+        ignore_conflicts=True,
+    )
+
+
+def remove_author(follower_id, author_id):
+    if inbox_enabled():
+        FeedItem.objects.filter(
+            user_id=follower_id, recipe__author_id=author_id,
+        ).delete()
+
+
+def rebuild_feed():
+    """Заполняет ленты заново по текущим подпискам."""
+    FeedItem.objects.all().delete()
+    follows = Follow.objects.order_by('author_id').values_list(
+        'author_id', 'follower_id',
+    )
+    created = 0
+    for author_id, group in groupby(follows.iterator(), lambda row: row[0]):
+        recipes = list(get_latest_recipes(author_id))
+        items = [
+            FeedItem(user_id=follower_id, recipe_id=recipe_id, pub_date=date)
+            for _, follower_id in group
+            for recipe_id, date in recipes
+        ]
+        FeedItem.objects.bulk_create(items, batch_size=BATCH_SIZE)
+        created += len(items)
+    return created
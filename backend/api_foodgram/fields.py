@@ -0,0 +1,35 @@
+from django.core.files.uploadedfile import UploadedFile
+from rest_framework import serializers
+
+from .images import ImageError, check_image, open_upload
+
+
+class HashedImageField(serializers.ImageField):
+    """
+    Изображение для поля модели с ContentAddressedStorage: строка
+    base64 в JSON или файл в multipart. Если файл с таким содержимым
+    уже сохранён, возвращается его имя без проверки через Pillow
+    и без повторной записи.
+    """
+
+    def to_internal_value(self, data):
+        if not data or not isinstance(data, (str, UploadedFile)):
+            raise serializers.ValidationError(
+                'Передайте изображение в base64 или файлом.'
+            )
+        try:
+            upload, digest, extension = open_upload(data)
+            if extension is not None:
+                model_field = self.parent.Meta.model._meta.get_field(
+                    self.source
+                )
+                name = model_field.generate_filename(
+                    None, f'{digest}.{extension}'
+                )
+                if model_field.storage.reuse(name):
+                    upload.close()
+                    return name
+            upload.name = f'image.{check_image(upload)}'
+        except ImageError as error:
+            raise serializers.ValidationError(str(error))
+        return upload
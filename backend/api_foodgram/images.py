@@ -0,0 +1,131 @@
+"""
+Загрузка изображений рецептов без лишних копий в памяти.
+
+base64 декодируется пачками во временный файл, который держится
+в памяти только до FILE_UPLOAD_MAX_MEMORY_SIZE. Размер файла
+проверяется до декодирования, размеры изображения - по заголовку.
+"""
+import base64
+import binascii
+import hashlib
+from io import BytesIO
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from PIL import Image
+
+IMAGE_EXTENSIONS = {'JPEG': 'jpg', 'PNG': 'png', 'GIF': 'gif', 'WEBP': 'webp'}
+# Символов base64 в пачке, кратно 4.
+DECODE_CHUNK_SIZE = 64 * 1024
+
+
+class ImageError(ValueError):
+    """Изображение не принято, текст ошибки - для пользователя."""
+
+
+def check_size(size):
+    if size > settings.IMAGE_UPLOAD_MAX_SIZE:
+        raise ImageError(
+            f'Размер изображения больше '
+            f'{settings.IMAGE_UPLOAD_MAX_SIZE // (1024 * 1024)} МБ.'
+        )
+
+
+def check_header(image):
+    """Формат и размеры по заголовку, пиксели при этом не читаются."""
+    extension = IMAGE_EXTENSIONS.get(image.format)
+    if extension is None:
+        raise ImageError('Неподдерживаемый формат изображения.')
+    width, height = image.size
+    if width * height > settings.IMAGE_UPLOAD_MAX_PIXELS:
+        raise ImageError(f'Слишком большое изображение: {width}x{height}.')
+    return extension
+
+
+def check_prefix(content):
+    """
+    Проверка по началу файла, возвращает расширение. Если заголовок
+    в него не поместился - None, решение откладывается до проверки
+    всего файла.
+    """
+    try:
+        image = Image.open(BytesIO(content))
+    except Image.DecompressionBombError:
+        raise ImageError('Слишком большое изображение.')
+    except Exception:
+        return None
+    with image:
+        return check_header(image)
+
+
+def decode_base64(data):
+    """
+    Декодирует изображение в base64 (можно с заголовком data:)
+    во временный файл. Возвращает UploadedFile, sha256 содержимого
+    и расширение по заголовку.
+    """
+    # Срез без заголовка был бы ещё одной копией всей строки.
+    offset = data.find(';base64,')
+    offset = 0 if offset < 0 else offset + len(';base64,')
+    check_size((len(data) - offset) // 4 * 3 - data[-2:].count('='))
+    file = SpooledTemporaryFile(settings.FILE_UPLOAD_MAX_MEMORY_SIZE)
+    digest = hashlib.sha256()
+    extension = None
+    try:
+        for start in range(offset, len(data), DECODE_CHUNK_SIZE):
+            try:
+                chunk = base64.b64decode(
+                    data[start:start + DECODE_CHUNK_SIZE], validate=True,
+                )
+            except (binascii.Error, ValueError):
+                raise ImageError('Изображение не в base64.')
+            if start == offset:
+                extension = check_prefix(chunk)
+            digest.update(chunk)
+            file.write(chunk)
+    except ImageError:
+        file.close()
+        raise
+    size = file.tell()
+    file.seek(0)
+    upload = UploadedFile(file, name='image', size=size)
+    return upload, digest.hexdigest(), extension
+
+
+def hash_file(file):
+    digest = hashlib.sha256()
+    for chunk in file.chunks():
+        digest.update(chunk)
+    file.seek(0)
+    return digest.hexdigest()
+
+
+def check_image(file):
+    """Проверяет файл изображения целиком, возвращает расширение."""
+    file.seek(0)
+    try:
+        with Image.open(file) as image:
+            extension = check_header(image)
+            image.verify()
+    except ImageError:
+        raise
+    except Image.DecompressionBombError:
+        raise ImageError('Слишком большое изображение.')
+    except Exception:
+        raise ImageError('Файл не является изображением.')
+    finally:
+        file.seek(0)
+    return extension
+
+
+def open_upload(data):
+    """
+    Файл изображения из строки base64 или загруженного файла.
+    Возвращает UploadedFile, sha256 содержимого и расширение.
+    """
+    if isinstance(data, UploadedFile):
+        check_size(data.size)
+        extension = check_prefix(data.read(DECODE_CHUNK_SIZE))
+        return data, hash_file(data), extension
+    return decode_base64(data)
@@ -0,0 +1,320 @@
+import asyncio
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from hmac import compare_digest
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+
+logger = logging.getLogger(__name__)
+
+# Метрики текущего запроса, если он попал в выборку.
+current_metrics = ContextVar('current_metrics', default=None)
+
+PLACEHOLDERS = re.compile(r'\((?:%s|\?)(?:,\s*(?:%s|\?))*\)')
+SPACES = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    """Нормализует SQL-запрос: списки параметров сворачиваются в (...)."""
+    return PLACEHOLDERS.sub('(...)', SPACES.sub(' ', sql)).strip()
+
+
+class RequestMetrics:
+    """
+    Метрики одного запроса: число и время SQL-запросов,
+    время этапов обработки и произвольные счётчики.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.view = None
+        # Считались ли SQL-запросы: под ASGI только в InstrumentedViewMixin.
+        self.collected = False
+        self.queries = 0
+        self.db_time = 0.0
+        self.stages = {}
+        self.fingerprints = Counter()
+        self.counters = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.queries += 1
+            self.fingerprints[fingerprint(sql)] += 1
+
+    def mark(self):
+        return time.perf_counter(), self.db_time
+
+    def stage(self, name, mark):
+        """Время этапа с момента mark без учёта времени в БД."""
+        started, db_time = mark
+        self.stages[name] = (
+            time.perf_counter() - started - (self.db_time - db_time)
+        )
+
+    @property
+    def total(self):
+        return time.perf_counter() - self.started
+
+    def server_timing(self, total):
+        timings = []
+        if self.collected:
+            timings.append(
+                f'db;dur={self.db_time * 1000:.1f};'
+                f'desc="{self.queries} queries"'
+            )
+        timings.extend(
+            f'{name};dur={duration * 1000:.1f}'
+            for name, duration in self.stages.items()
+        )
+        timings.append(f'total;dur={total * 1000:.1f}')
+        return ', '.join(timings)
+
+
+class MetricsRegistry:
+    """
+    Накопленные метрики процесса по действиям представлений.
+    С METRICS_DIR каждый воркер раз в flush_interval секунд сохраняет
+    свои метрики в файл каталога, а export складывает файлы всех
+    воркеров, как multiprocess-режим prometheus_client. Файлы
+    завершившихся воркеров остаются, поэтому счётчики не убывают.
+    """
+    flush_interval = 1
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        # После fork у воркера свои метрики и свой файл.
+        self.pid = os.getpid()
+        self.path = None
+        self.dirty = False
+        self.values = defaultdict(Counter)
+
+    def add(self, metrics, total):
+        with self.lock:
+            if self.pid != os.getpid():
+                self.reset()
+            if settings.METRICS_DIR and self.path is None:
+                self.path = os.path.join(
+                    settings.METRICS_DIR,
+                    f'{self.pid}-{os.urandom(4).hex()}.json',
+                )
+                threading.Thread(target=self.flush_loop, daemon=True).start()
+            self.dirty = True
+            values = self.values[metrics.view]
+            values['requests'] += 1
+            if metrics.collected:
+                values['db_queries'] += metrics.queries
+                values['db_seconds'] += metrics.db_time
+            values['request_seconds'] += total
+            for name, duration in metrics.stages.items():
+                values[f'{name}_seconds'] += duration
+            values.update(metrics.counters)
+
+    def flush(self):
+        with self.lock:
+            if not self.dirty or self.pid != os.getpid():
+                return
+            self.dirty = False
+            path = self.path
+            content = json.dumps(self.values)
+        # Замена целиком: export не прочитает файл наполовину.
+        with open(f'{path}.tmp', 'w') as file:
+            file.write(content)
+        os.replace(f'{path}.tmp', path)
+
+    def flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except OSError:
+                logger.exception('Не удалось сохранить метрики')
+
+    def collect(self):
+        """Метрики этого процесса и остальных воркеров из METRICS_DIR."""
+        values = defaultdict(Counter)
+        with self.lock:
+            own = self.path if self.pid == os.getpid() else None
+            for view, counters in self.values.items():
+                values[view].update(counters)
+        if settings.METRICS_DIR:
+            for name in os.listdir(settings.METRICS_DIR):
+                path = os.path.join(settings.METRICS_DIR, name)
+                if not name.endswith('.json') or path == own:
+                    continue
+                try:
+                    with open(path) as file:
+                        worker = json.load(file)
+                except (OSError, ValueError):
+                    continue
+                for view, counters in worker.items():
+                    values[view].update(counters)
+        return values
+
+    def export(self):
+        lines = []
+        items = sorted(self.collect().items())
+        names = sorted({name for _, values in items for name in values})
+        for name in names:
+            lines.append(f'# TYPE foodgram_{name}_total counter')
+            lines.extend(
+                f'foodgram_{name}_total{{view="{view}"}} {values[name]:g}'
+                for view, values in items if name in values
+            )
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+@contextmanager
+def collect_queries(metrics):
+    """
+    Считает SQL-запросы соединений текущего потока. Соединения,
+    которые уже считаются для этих метрик, пропускаются.
+    """
+    metrics.collected = True
+    with ExitStack() as stack:
+        for connection in connections.all():
+            if metrics not in connection.execute_wrappers:
+                stack.enter_context(connection.execute_wrapper(metrics))
+        yield
+
+
+class InstrumentedViewMixin:
+    """
+    Замеряет этапы обработки запроса в DRF-представлении:
+    auth (аутентификация и права), serialize (обработчик
+    без учёта времени в БД) и render. SQL-запросы считаются
+    в потоке представления: под ASGI это не поток middleware.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        metrics = current_metrics.get()
+        if metrics is None:
+            return super().dispatch(request, *args, **kwargs)
+        with collect_queries(metrics):
+            return super().dispatch(request, *args, **kwargs)
+
+    def initial(self, request, *args, **kwargs):
+        metrics = current_metrics.get()
+        if metrics is None:
+            return super().initial(request, *args, **kwargs)
+        action = getattr(self, 'action', None) or request.method.lower()
+        metrics.view = f'{self.__class__.__name__}.{action}'
+        mark = metrics.mark()
+        super().initial(request, *args, **kwargs)
+        metrics.stage('auth', mark)
+        self.handler_mark = metrics.mark()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        metrics = current_metrics.get()
+        if metrics is not None and hasattr(self, 'handler_mark'):
+            metrics.stage('serialize', self.handler_mark)
+            if not hasattr(response, 'add_post_render_callback'):
+                return response
+            render_mark = metrics.mark()
+            response.add_post_render_callback(
+                lambda response: metrics.stage('render', render_mark)
+            )
+        return response
+
+
+class InstrumentationMiddleware:
+    """
+    Собирает метрики для доли запросов INSTRUMENTATION_SAMPLE_RATE:
+    отдаёт их в заголовке Server-Timing, копит для /metrics/
+    и пишет в лог запросы медленнее SLOW_REQUEST_MS.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.INSTRUMENTATION_SAMPLE_RATE:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            # Под ASGI middleware асинхронный, как MiddlewareMixin,
+            # и запросы не ждут общего потока для синхронного кода.
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.acall(request)
+        if random.random() >= settings.INSTRUMENTATION_SAMPLE_RATE:
+            return self.get_response(request)
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        try:
+            with collect_queries(metrics):
+                response = self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        return self.report(request, response, metrics)
+
+    async def acall(self, request):
+        if random.random() >= settings.INSTRUMENTATION_SAMPLE_RATE:
+            return await self.get_response(request)
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        return self.report(request, response, metrics)
+
+    def report(self, request, response, metrics):
+        total = metrics.total
+        if metrics.view is None:
+            match = request.resolver_match
+            metrics.view = match.view_name if match else 'unresolved'
+        response['Server-Timing'] = metrics.server_timing(total)
+        registry.add(metrics, total)
+        if total * 1000 >= settings.SLOW_REQUEST_MS:
+            logger.warning(
+                'Медленный запрос %s %s (%s): %.1f мс, %d SQL за %.1f мс\n%s',
+                request.method, request.get_full_path(), metrics.view,
+                total * 1000, metrics.queries, metrics.db_time * 1000,
+                '\n'.join(
+                    f'{count} x {sql}'
+                    for sql, count in metrics.fingerprints.most_common(10)
+                ),
+            )
+        return response
+
+
+def metrics_view(request):
+    """
+    Метрики в текстовом формате Prometheus: всех воркеров с METRICS_DIR,
+    иначе только ответившего процесса. Доступны сотрудникам и по
+    заголовку Authorization: Bearer METRICS_TOKEN.
+    """
+    token = settings.METRICS_TOKEN
+    if not request.user.is_staff and not (token and compare_digest(
+        request.headers.get('Authorization', ''), f'Bearer {token}',
+    )):
+        return HttpResponseForbidden()
+    return HttpResponse(
+        registry.export(), content_type='text/plain; version=0.0.4',
+    )
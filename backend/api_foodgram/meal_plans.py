@@ -0,0 +1,112 @@
+"""
+Список покупок плана питания. Количества ингредиентов умножаются
+на число порций и суммируются одним запросом с группировкой.
+Список хранится в кеше по плану, а при изменении рецептов плана
+пересчитывается по разнице с прежним списком, а не заново.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import Coalesce
+
+from recipes.models import MealPlan, MealPlanRecipe
+from .cache import ALL_RECIPES, get_version_key
+
+
+def get_plan_key(plan_id):
+    return f'meal-plan-ingredients:{plan_id}'
+
+
+def annotate_state(queryset):
+    """Добавляет к планам то, от чего зависит их список покупок."""
+    return queryset.annotate(
+        recipes_count=Count('days__recipes'),
+        recipes_version=Coalesce(Sum('days__recipes__recipe__version'), 0),
+    )
+
+
+def get_state(plan, graph_version):
+    """
+    Состояние плана для кеша: версия плана меняется с его рецептами,
+    сумма версий рецептов - при их правке, число рецептов - при
+    удалении рецепта, версия справочников - при правке ингредиентов.
+    """
+    return (
+        plan.version, plan.recipes_count, plan.recipes_version, graph_version,
+    )
+
+
+def aggregate_ingredients(plan_id):
+    amount = 'recipe__am_ingredients__amount'
+    ingredient = 'recipe__am_ingredients__ingredients__'
+    return {
+        (name, unit): total
+        for name, unit, total in MealPlanRecipe.objects.filter(
+            day__plan_id=plan_id,
+        ).values_list(
+            ingredient + 'name', ingredient + 'measurement_unit',
+        ).annotate(total=Sum(F(amount) * F('servings'))).order_by()
+        if name is not None
+    }
+
+
+def get_plan_ingredients(plan):
+    """
+    Список покупок плана из annotate_state: (название, единица,
+    количество) по алфавиту.
+    """
+    key = get_plan_key(plan.id)
+    values = cache.get_many((key, get_version_key(ALL_RECIPES)))
+    state = get_state(plan, values.get(get_version_key(ALL_RECIPES), 0))
+    cached = values.get(key)
+    if cached is not None and cached[0] == state:
+        totals = cached[1]
+    else:
+        totals = aggregate_ingredients(plan.id)
+        cache.set(key, (state, totals), settings.MEAL_PLAN_CACHE_TIMEOUT)
+    return [
+        (name, unit, total) for (name, unit), total in sorted(totals.items())
+    ]
+
+
+def update_plan_ingredients(plan, recipe, servings, recipes_count):
+    """
+    Прибавляет к списку в кеше servings порций рецепта (меньше нуля -
+    убавляет). plan - состояние до изменения; если в кеше список
+    для другого состояния, он удаляется.
+    """
+    key = get_plan_key(plan.id)
+    values = cache.get_many((key, get_version_key(ALL_RECIPES)))
+    if key not in values:
+        return
+    graph_version = values.get(get_version_key(ALL_RECIPES), 0)
+    state, totals = values[key]
+    if state != get_state(plan, graph_version):
+        cache.delete(key)
+        return
+    for amount in recipe.am_ingredients.all():
+        ingredient = (
+            amount.ingredients.name, amount.ingredients.measurement_unit,
+        )
+        totals[ingredient] = totals.get(ingredient, 0) + (
+            amount.amount * servings
+        )
+        if not totals[ingredient]:
+            del totals[ingredient]
+    state = (
+        plan.version + 1, plan.recipes_count + recipes_count,
+        plan.recipes_version + recipes_count * recipe.version, graph_version,
+    )
+    cache.set(key, (state, totals), settings.MEAL_PLAN_CACHE_TIMEOUT)
+
+
+def plan_changed(plan, recipe, servings, recipes_count=0):
+    """
+    Вызывается в транзакции, изменившей рецепты плана: увеличивает
+    версию плана и после фиксации обновляет его список в кеше.
+    """
+    MealPlan.objects.filter(pk=plan.pk).update(version=F('version') + 1)
+    transaction.on_commit(
+        lambda: update_plan_ingredients(plan, recipe, servings, recipes_count)
+    )
@@ -0,0 +1,74 @@
+import asyncio
+from hashlib import sha1
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from rest_framework import permissions
+
+from .cache import is_cache_shared
+from .db import use_replica
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Разрешает чтение с реплик для безопасных запросов.
+    После изменения данных пользователь на REPLICA_PIN_SECONDS
+    закрепляется за основной БД, чтобы сразу видеть свои изменения.
+    Закрепление хранится в кеше, поэтому кеш должен быть общим
+    для воркеров, иначе следующий запрос попадёт в другой воркер
+    и прочитает реплику.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        if not is_cache_shared():
+            raise ImproperlyConfigured(
+                'Для реплик (DB_REPLICA_HOSTS) нужен общий для воркеров '
+                'кеш: задайте CACHE_BACKEND и CACHE_LOCATION.'
+            )
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def get_pin_key(self, request):
+        auth = request.META.get('HTTP_AUTHORIZATION')
+        if auth:
+            return f'primary-pin:{sha1(auth.encode()).hexdigest()}'
+        return None
+
+    def start(self, request):
+        pin_key = self.get_pin_key(request)
+        safe = request.method in permissions.SAFE_METHODS
+        token = use_replica.set(
+            safe and not (pin_key and cache.get(pin_key))
+        )
+        return pin_key, safe, token
+
+    def finish(self, response, pin_key, safe):
+        # Неудачная запись ничего не изменила, закреплять незачем.
+        if not safe and pin_key and response.status_code < 400:
+            cache.set(pin_key, True, settings.REPLICA_PIN_SECONDS)
+        return response
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.acall(request)
+        pin_key, safe, token = self.start(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            use_replica.reset(token)
+        return self.finish(response, pin_key, safe)
+
+    async def acall(self, request):
+        pin_key, safe, token = self.start(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            use_replica.reset(token)
+        return self.finish(response, pin_key, safe)
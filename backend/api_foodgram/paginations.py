@@ -1,5 +1,47 @@
-from rest_framework.pagination import PageNumberPagination
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from rest_framework.pagination import CursorPagination, PageNumberPagination
 
 
 class CustomPagination(PageNumberPagination):
     page_size_query_param = 'limit'
+
+
+class FeedPagination(CursorPagination):
+    """ Пагинация ленты по курсору: страница не зависит от глубины."""
+    ordering = '-pub_date'
+    page_size_query_param = 'limit'
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Пагинатор списков админки. Для большой таблицы без фильтров
+    число строк берётся из статистики PostgreSQL вместо COUNT(*).
+    """
+    # Меньшие таблицы считаются точно, это быстро.
+    estimate_threshold = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if (
+            connection.vendor == 'postgresql'
+            and not queryset.query.where and not queryset.query.distinct
+        ):
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+                    [queryset.model._meta.db_table],
+                )
+                row = cursor.fetchone()
+            if row and row[0] >= self.estimate_threshold:
+                return int(row[0])
+        return super().count
+
+
+class EstimatedCountAdminMixin:
+    """Списки админки без точного подсчёта всех строк таблицы."""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
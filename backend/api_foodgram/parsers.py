@@ -0,0 +1,102 @@
+import json
+
+from django.conf import settings
+from rest_framework import status
+from rest_framework.exceptions import APIException, ParseError
+from rest_framework.parsers import (BaseParser, DataAndFiles, JSONParser,
+                                    MultiPartParser)
+
+from .renderers import FastJSONRenderer, orjson
+
+
+class PayloadTooLarge(APIException):
+    status_code = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    default_detail = 'Слишком большой запрос.'
+    default_code = 'payload_too_large'
+
+
+def check_content_length(parser_context, max_size):
+    """Отклоняет запрос по Content-Length до чтения тела."""
+    request = parser_context.get('request')
+    if request is None:
+        return
+    try:
+        length = int(request.META.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        length = 0
+    if length > max_size:
+        raise PayloadTooLarge
+
+
+class FastJSONParser(JSONParser):
+    """
+    Парсер JSON на основе orjson.
+    Без orjson или для кодировок, отличных от UTF-8, работает как JSONParser.
+    """
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        max_size = settings.DATA_UPLOAD_MAX_MEMORY_SIZE
+        if max_size is not None:
+            check_content_length(parser_context, max_size)
+        if orjson is None or encoding.lower() not in ('utf-8', 'utf8'):
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except ValueError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
+
+
+class NDJSONParser(BaseParser):
+    """
+    Парсер NDJSON: request.data - итератор строк тела запроса.
+    Тело читается по мере обработки строк, а не целиком.
+    """
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        return iter(stream.readline, b'')
+
+
+class MultiPartData(dict):
+    """
+    Поля из части data. Request.data добавляет к ним файлы через
+    update: из MultiValueDict берётся последний файл, а не список.
+    """
+
+    def copy(self):
+        return MultiPartData(self)
+
+    def update(self, other):
+        super().update(other.items())
+
+
+class JSONMultiPartParser(MultiPartParser):
+    """
+    multipart/form-data, в котором файлы передаются частями, а остальные
+    поля - объектом JSON в части data. Файлы больше
+    FILE_UPLOAD_MAX_MEMORY_SIZE Django пишет во временные файлы.
+    Без части data работает как MultiPartParser.
+    """
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        check_content_length(
+            parser_context,
+            settings.IMAGE_UPLOAD_MAX_SIZE
+            + (settings.DATA_UPLOAD_MAX_MEMORY_SIZE or 0),
+        )
+        parsed = super().parse(stream, media_type, parser_context)
+        if 'data' not in parsed.data:
+            return parsed
+        try:
+            data = json.loads(parsed.data['data'])
+        except ValueError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
+        if not isinstance(data, dict):
+            raise ParseError('Часть data должна содержать объект JSON.')
+        # Файлы остаются в request.FILES, чтобы Django закрыл их
+        # после ответа.
+        return DataAndFiles(MultiPartData(data), parsed.files)
@@ -1,10 +1,17 @@
+from operator import attrgetter
+
+from django.db import transaction
 from djoser.serializers import UserCreateSerializer, UserSerializer
-from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers, status
 
 from recipes.models import (Cart, Favorite, Ingredient, IngredientAmount,
-                            Recipe, Tag)
+                            MealPlan, MealPlanDay, MealPlanRecipe, Recipe,
+                            Tag)
+from recipes.similarity import schedule_similar_update
 from users.models import Follow, User
+from .cache import get_cached_recipe
+from .conditional import lock_version
+from .fields import HashedImageField
 
 
 class CustomUserCreateSerializer(UserCreateSerializer):
@@ -41,6 +48,8 @@ class CustomUserSerializer(UserSerializer):
         )
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             return Follow.objects.filter(
@@ -65,26 +74,6 @@ class IngredientSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'measurement_unit',)
 
 
-class IngredientAmountSerializer(serializers.ModelSerializer):
-    """
-    Сериализатор вспомогательной модели
-    ингредиента для рецепта с количеством.
-    """
-    id = serializers.ReadOnlyField(
-        source='ingredients.id',
-    )
-    name = serializers.ReadOnlyField(
-        source='ingredients.name',
-    )
-    measurement_unit = serializers.ReadOnlyField(
-        source='ingredients.measurement_unit',
-    )
-
-    class Meta:
-        model = IngredientAmount
-        fields = ('id', 'name', 'measurement_unit', 'amount',)
-
-
 class CreateIngredientInRecipeSerializer(serializers.ModelSerializer):
     """ Сериализатор создания ингредиента в рецепте."""
     id = serializers.PrimaryKeyRelatedField(
@@ -96,42 +85,93 @@ class CreateIngredientInRecipeSerializer(serializers.ModelSerializer):
         fields = ('id', 'amount',)
 
 
-class RecipeListSerializer(serializers.ModelSerializer):
-    """ Сериализатор для просмотра рецептов."""
-    tags = TagSerializer(
-        many=True,
-    )
-    author = CustomUserSerializer()
-    ingredients = IngredientAmountSerializer(
-        source='am_ingredients',
-        many=True,
+class RecipeReadListSerializer(serializers.ListSerializer):
+    """
+    Списочный сериализатор быстрого просмотра рецептов.
+    Отметки пользователя загружаются одним запросом на всю страницу.
+    """
+
+    def to_representation(self, data):
+        recipes = list(data.all() if hasattr(data, 'all') else data)
+        marks = self.child.get_user_marks(recipes)
+        return [self.child.render(recipe, marks) for recipe in recipes]
+
+
+class RecipeReadSerializer(serializers.BaseSerializer):
+    """
+    Быстрый сериализатор для просмотра рецептов: ответ вложенного
+    ModelSerializer без вложенных сериализаторов и обхода полей.
+    Ответы сверяет benchmarks/recipe_serializer.py.
+    """
+    tag_fields = ('id', 'name', 'color', 'slug')
+    author_fields = ('email', 'id', 'username', 'first_name', 'last_name')
+    ingredient_fields = ('id', 'name', 'measurement_unit', 'amount')
+
+    get_tag = attrgetter(*tag_fields)
+    get_author = attrgetter(*author_fields)
+    get_ingredient = attrgetter(
+        'ingredients.id', 'ingredients.name',
+        'ingredients.measurement_unit', 'amount',
     )
-    is_favorited = serializers.SerializerMethodField()
-    is_in_shopping_cart = serializers.SerializerMethodField()
 
     class Meta:
-        model = Recipe
-        fields = (
-            'id', 'tags', 'author', 'ingredients', 'name', 'is_favorited',
-            'is_in_shopping_cart', 'image', 'text', 'cooking_time',
-        )
-        read_only_fields = ('__all__',)
+        list_serializer_class = RecipeReadListSerializer
 
-    def get_is_favorited(self, obj):
+    def get_user_marks(self, recipes):
         request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return Favorite.objects.filter(
-                recipe=obj, author=request.user
-            ).exists()
-        return False
-
-    def get_is_in_shopping_cart(self, obj):
+        if not (request and request.user.is_authenticated and recipes):
+            return set(), set(), set()
+        user = request.user
+        recipe_ids = [recipe.id for recipe in recipes]
+        favorited = set(Favorite.objects.filter(
+            author=user, recipe__in=recipe_ids
+        ).values_list('recipe_id', flat=True))
+        in_cart = set(Cart.objects.filter(
+            author=user, recipe__in=recipe_ids
+        ).values_list('recipe_id', flat=True))
+        # На себя подписаться нельзя, свои рецепты не проверяем.
+        author_ids = {recipe.author_id for recipe in recipes} - {user.id}
+        subscribed = set(Follow.objects.filter(
+            follower=user, author__in=author_ids,
+        ).values_list('author_id', flat=True)) if author_ids else set()
+        return favorited, in_cart, subscribed
+
+    def get_image(self, recipe):
+        if not recipe.image:
+            return None
+        url = recipe.image.url
         request = self.context.get('request')
-        if request and request.user.is_authenticated:
-            return Cart.objects.filter(
-                recipe=obj, author=request.user
-            ).exists()
-        return False
+        if request is not None:
+            return request.build_absolute_uri(url)
+        return url
+
+    def render(self, recipe, marks):
+        favorited, in_cart, subscribed = marks
+        tag_fields = self.tag_fields
+        ingredient_fields = self.ingredient_fields
+        author = dict(zip(self.author_fields, self.get_author(recipe.author)))
+        author['is_subscribed'] = recipe.author_id in subscribed
+        return {
+            'id': recipe.id,
+            'tags': [
+                dict(zip(tag_fields, self.get_tag(tag)))
+                for tag in recipe.tags.all()
+            ],
+            'author': author,
+            'ingredients': [
+                dict(zip(ingredient_fields, self.get_ingredient(amount)))
+                for amount in recipe.am_ingredients.all()
+            ],
+            'name': recipe.name,
+            'is_favorited': recipe.id in favorited,
+            'is_in_shopping_cart': recipe.id in in_cart,
+            'image': self.get_image(recipe),
+            'text': recipe.text,
+            'cooking_time': recipe.cooking_time,
+        }
+
+    def to_representation(self, instance):
+        return self.render(instance, self.get_user_marks([instance]))
 
 
 class RecipeCreateSerializer(serializers.ModelSerializer):
@@ -148,7 +188,7 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         many=True,
         required=True,
     )
-    image = Base64ImageField(
+    image = HashedImageField(
         required=True,
     )
 
@@ -160,7 +200,9 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         )
 
     def to_representation(self, instance):
-        return RecipeListSerializer(instance).data
+        return RecipeReadSerializer(
+            get_cached_recipe(instance.id), context=self.context,
+        ).data
 
     def validate(self, data):
         if not data.get('tags'):
@@ -198,31 +240,81 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
                 ingredients=ingredient['id'],
                 amount=ingredient['amount'],
             )
+        schedule_similar_update(
+            recipe.id,
+            [ingredient['id'].id for ingredient in ingredients_data],
+            [tag.id for tag in tags],
+        )
         return recipe
 
-    def update(self, instance, validated_data):
-        instance.name = validated_data.get('name', instance.name)
-        instance.image = validated_data.get('image', instance.image)
-        instance.text = validated_data.get('text', instance.text)
-        instance.cooking_time = validated_data.get(
-            'cooking_time', instance.cooking_time
+    def update_tags(self, instance, tags):
+        """Добавляет и удаляет только изменившиеся теги."""
+        current = {tag.id for tag in instance.tags.all()}
+        new = {tag.id for tag in tags}
+        if current - new:
+            instance.tags.remove(*(current - new))
+        if new - current:
+            instance.tags.add(*(new - current))
+        return current != new
+
+    def update_ingredients(self, instance, ingredients_data):
+        """
+        Сравнивает ингредиенты рецепта с новыми: строки с другим
+        количеством обновляются, лишние удаляются, новые создаются.
+        """
+        amounts = {
+            ingredient['id'].id: ingredient['amount']
+            for ingredient in ingredients_data
+        }
+        kept = {}
+        changed = []
+        removed = []
+        for row in instance.am_ingredients.all():
+            if row.ingredients_id not in amounts or row.ingredients_id in kept:
+                removed.append(row.id)
+                continue
+            kept[row.ingredients_id] = row
+            if row.amount != amounts[row.ingredients_id]:
+                row.amount = amounts[row.ingredients_id]
+                changed.append(row)
+        if removed:
+            IngredientAmount.objects.filter(id__in=removed).delete()
+        if changed:
+            IngredientAmount.objects.bulk_update(changed, ('amount',))
+        IngredientAmount.objects.bulk_create(
+            IngredientAmount(
+                recipe=instance, ingredients=ingredient['id'],
+                amount=ingredient['amount'],
+            )
+            for ingredient in ingredients_data
+            if ingredient['id'].id not in kept
         )
+        return bool(removed) or len(kept) != len(amounts)
 
+    def update(self, instance, validated_data):
         tags = validated_data.pop('tags')
         ingredients_data = validated_data.pop('ingredients')
 
-        instance.tags.clear()
-        instance.tags.set(tags)
-
-        instance.ingredients.clear()
-        for ingredient in ingredients_data:
-            IngredientAmount.objects.create(
-                recipe=instance,
-                ingredients=ingredient['id'],
-                amount=ingredient['amount'],
+        with transaction.atomic():
+            instance = lock_version(
+                instance, self.context.get('if_match_versions'),
+            )
+            update_fields = ['version']
+            for field, value in validated_data.items():
+                if getattr(instance, field) != value:
+                    setattr(instance, field, value)
+                    update_fields.append(field)
+            tags_changed = self.update_tags(instance, tags)
+            ingredients_changed = self.update_ingredients(
+                instance, ingredients_data,
+            )
+            instance.save(update_fields=update_fields)
+        if tags_changed or ingredients_changed:
+            schedule_similar_update(
+                instance.id,
+                [ingredient['id'].id for ingredient in ingredients_data],
+                [tag.id for tag in tags],
             )
-
-        instance.save()
         return instance
 
 
@@ -268,7 +360,7 @@ class FollowSerializer(serializers.ModelSerializer):
     def get_is_subscribed(self, obj):
         request = self.context.get('request')
         if request.user.is_authenticated:
-            return Follow.objects.filter(
+            return obj.follower_id == request.user.id or Follow.objects.filter(
                 author=obj.author, follower=request.user
             ).exists()
         return False
@@ -276,13 +368,15 @@ class FollowSerializer(serializers.ModelSerializer):
     def get_recipes(self, obj):
         request = self.context.get('request')
         recipes_limit = request.query_params.get('recipes_limit')
-        recipes = Recipe.objects.filter(author=obj.author)
+        recipes = obj.author.recipes.all()
         if recipes_limit is not None:
             recipes = recipes[:int(recipes_limit)]
         return RecipeShortListSerializer(recipes, many=True,).data
 
     def get_recipes_count(self, obj):
-        return Recipe.objects.filter(author=obj.author).count()
+        if hasattr(obj, 'recipes_count'):
+            return obj.recipes_count
+        return obj.author.recipes.count()
 
     def validate(self, data):
         follower = self.context.get('request').user
@@ -315,3 +409,30 @@ class CartSerializer(serializers.ModelSerializer):
 
     def to_representation(self, instance):
         return RecipeShortListSerializer(instance.recipe).data
+
+
+class MealPlanRecipeSerializer(serializers.ModelSerializer):
+    """ Сериализатор рецепта в дне плана питания."""
+    recipe = RecipeShortListSerializer(read_only=True)
+
+    class Meta:
+        model = MealPlanRecipe
+        fields = ('recipe', 'servings',)
+
+
+class MealPlanDaySerializer(serializers.ModelSerializer):
+    """ Сериализатор дня плана питания."""
+    recipes = MealPlanRecipeSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = MealPlanDay
+        fields = ('date', 'recipes',)
+
+
+class MealPlanSerializer(serializers.ModelSerializer):
+    """ Сериализатор плана питания, дни меняются через его рецепты."""
+    days = MealPlanDaySerializer(many=True, read_only=True)
+
+    class Meta:
+        model = MealPlan
+        fields = ('id', 'name', 'days',)
@@ -0,0 +1,52 @@
+import gzip
+from functools import partial
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE = (
+    '.css', '.js', '.map', '.json', '.svg', '.txt', '.html', '.xml',
+    '.ttf', '.eot',
+)
+# Файлы меньше этого размера сжимать нет смысла.
+MIN_COMPRESS_SIZE = 256
+
+
+def get_compressors():
+    yield '.gz', partial(gzip.compress, compresslevel=9, mtime=0)
+    if brotli is not None:
+        yield '.br', brotli.compress
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    Статика с хешем содержимого в имени файла. При collectstatic
+    рядом с каждым файлом создаются сжатые копии .gz и .br
+    для gzip_static и brotli_static в nginx.
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if not dry_run:
+            for name in set(self.hashed_files.values()):
+                self.compress(name)
+
+    def compress(self, name):
+        if not name.endswith(COMPRESSIBLE):
+            return
+        with self.open(name) as file:
+            content = file.read()
+        if len(content) < MIN_COMPRESS_SIZE:
+            return
+        for suffix, compress in get_compressors():
+            # Содержимое файла с хешем в имени не меняется.
+            if self.exists(name + suffix):
+                continue
+            compressed = compress(content)
+            if len(compressed) < len(content):
+                self.save(name + suffix, ContentFile(compressed))
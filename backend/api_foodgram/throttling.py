@@ -0,0 +1,156 @@
+"""
+Ограничение частоты дорогих запросов корзиной токенов.
+
+Область задаётся действию в throttle_scopes представления, скорость
+области - в DEFAULT_THROTTLE_RATES ('10/min'): столько запросов можно
+сделать подряд, дальше токены восстанавливаются равномерно. В общем
+кеше корзина приближается скользящим окном атомарных счётчиков.
+"""
+import logging
+import threading
+import time
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.module_loading import import_string
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+from .instrumentation import current_metrics
+
+logger = logging.getLogger(__name__)
+
+DURATIONS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """'10/min' -> (10, 60), как в SimpleRateThrottle."""
+    count, period = rate.split('/')
+    return int(count), DURATIONS[period[0]]
+
+
+def take_token(tat, interval, capacity, now):
+    """
+    Берёт токен из корзины. Состояние корзины - время, к которому
+    она наполнится (GCRA). Возвращает ожидание в секундах, 0 - токен
+    получен, и новое состояние.
+    """
+    tat = max(tat or now, now)
+    wait = tat + interval - now - capacity * interval
+    if wait > 0:
+        return wait, tat
+    return 0, tat + interval
+
+
+class CacheBucketStore:
+    """
+    Ограничение в кеше Django. Общее для воркеров только с общим кешем
+    (memcached в docker-compose): с LocMemCache у каждого процесса свои
+    счётчики и предел умножается на число воркеров.
+    Кеш не умеет атомарно прочитать и записать состояние корзины,
+    поэтому она заменена скользящим окном из двух счётчиков на
+    cache.add и cache.incr: за capacity * interval секунд проходит
+    не больше capacity запросов с учётом доли предыдущего окна.
+    """
+
+    def consume(self, key, interval, capacity, now):
+        window = interval * capacity
+        number, elapsed = divmod(now, window)
+        current_key = f'{key}:{int(number)}'
+        previous = cache.get(f'{key}:{int(number) - 1}', 0)
+        # Счётчик нужен в своём окне и в следующем как предыдущий.
+        timeout = int(2 * window) + 1
+        cache.add(current_key, 0, timeout)
+        try:
+            count = cache.incr(current_key)
+        except ValueError:
+            # Счётчик вытеснен из кеша между add и incr.
+            cache.add(current_key, 1, timeout)
+            count = 1
+        share = previous * (1 - elapsed / window)
+        if share + count <= capacity:
+            return 0
+        try:
+            cache.decr(current_key)
+        except ValueError:
+            pass
+        if count > capacity:
+            return window - elapsed
+        # Через сколько доля предыдущего окна освободит место под запрос.
+        return window * (1 - (capacity - count) / previous) - elapsed
+
+
+class LocalBucketStore:
+    """Корзины в памяти процесса под одной блокировкой, для тестов."""
+    # При таком числе корзин из памяти удаляются полные.
+    max_buckets = 10000
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.buckets = {}
+
+    def consume(self, key, interval, capacity, now):
+        with self.lock:
+            if len(self.buckets) >= self.max_buckets:
+                self.buckets = {
+                    key: tat for key, tat in self.buckets.items() if tat > now
+                }
+            wait, tat = take_token(
+                self.buckets.get(key), interval, capacity, now,
+            )
+            if not wait:
+                self.buckets[key] = tat
+        return wait
+
+    def clear(self):
+        with self.lock:
+            self.buckets.clear()
+
+
+@lru_cache(maxsize=None)
+def get_store():
+    return import_string(settings.THROTTLE_STORE)()
+
+
+class ScopedBucketThrottle(BaseThrottle):
+    """
+    Ограничение по области действия: пользователь - по id, аноним -
+    по IP. Действия без области и области без скорости не ограничены.
+    Решения считаются в метриках запроса как throttle_<область>_*.
+    """
+    timer = time.time
+
+    def allow_request(self, request, view):
+        self.wait_time = None
+        scope = getattr(view, 'throttle_scopes', {}).get(
+            getattr(view, 'action', None)
+        )
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(scope)
+        if not rate:
+            return True
+        capacity, duration = parse_rate(rate)
+        if request.user.is_authenticated:
+            ident = f'user-{request.user.pk}'
+        else:
+            ident = self.get_ident(request)
+        self.wait_time = get_store().consume(
+            f'throttle:{scope}:{ident}', duration / capacity, capacity,
+            self.timer(),
+        )
+        metrics = current_metrics.get()
+        if metrics is not None:
+            metrics.counters[
+                f'throttle_{scope}_rejected' if self.wait_time
+                else f'throttle_{scope}_allowed'
+            ] += 1
+        if self.wait_time:
+            logger.info(
+                'Запрос %s %s ограничен (%s, %s): повтор через %.1f с',
+                request.method, request.path, scope, ident, self.wait_time,
+            )
+            return False
+        return True
+
+    def wait(self):
+        return self.wait_time
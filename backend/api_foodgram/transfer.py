@@ -0,0 +1,308 @@
+"""
+Пакетный импорт и экспорт рецептов в JSONL: один рецепт на строку.
+Теги и ингредиенты указываются по названию, изображение - в base64.
+"""
+import base64
+import json
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.db.models import prefetch_related_objects
+from django.utils.dateparse import parse_datetime
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from recipes.models import Ingredient, IngredientAmount, Recipe, Tag
+from users.models import User
+from .cache import RECIPE_PREFETCH
+from .images import ImageError, check_image, decode_base64
+from .renderers import orjson
+
+BATCH_SIZE = 500
+WORKERS = 4
+
+RecipeTag = Recipe.tags.through
+
+if orjson is not None:
+    loads = orjson.loads
+    dumps = orjson.dumps
+else:
+    loads = json.loads
+
+    def dumps(data):
+        return json.dumps(data, ensure_ascii=False).encode()
+
+
+class RecordError(ValueError):
+    """Ошибка в строке импорта, строка пропускается."""
+
+
+class StreamingUnavailable(APIException):
+    status_code = status.HTTP_501_NOT_IMPLEMENTED
+    default_detail = (
+        'Потоковая выгрузка работает только в WSGI-воркерах, резервную '
+        'копию можно сделать командой export_recipes.'
+    )
+    default_code = 'streaming_unavailable'
+
+
+def check_streaming(request):
+    """
+    Django 3.2 под ASGI перебирает тело StreamingHttpResponse в цикле
+    событий, где запросы к БД из выгрузки падают с
+    SynchronousOnlyOperation уже после отправки заголовков.
+    Поэтому под ASGI выгрузка отклоняется до начала ответа.
+    """
+    if isinstance(request._request, ASGIRequest):
+        raise StreamingUnavailable
+
+
+def get_int(record, field, min_value, max_value=None):
+    value = record.get(field)
+    if (
+        not isinstance(value, int) or isinstance(value, bool)
+        or value < min_value or max_value is not None and value > max_value
+    ):
+        raise RecordError(f'Неверное значение {field}: {value!r}.')
+    return value
+
+
+def get_str(record, field, max_length=None):
+    value = record.get(field)
+    if not isinstance(value, str) or not value.strip():
+        raise RecordError(f'Не указано поле {field}.')
+    if max_length is not None and len(value) > max_length:
+        raise RecordError(f'Поле {field} длиннее {max_length} символов.')
+    return value
+
+
+def store_image(data):
+    """
+    Проверяет изображение в base64 и сохраняет его в хранилище рецептов.
+    Выполняется в пуле потоков, ошибка возвращается, а не выбрасывается.
+    """
+    try:
+        upload, _, _ = decode_base64(data)
+        extension = check_image(upload)
+    except ImageError as error:
+        return RecordError(str(error))
+    field = Recipe._meta.get_field('image')
+    with upload:
+        return field.storage.save(
+            field.generate_filename(None, f'import.{extension}'), upload,
+        )
+
+
+class RecipeImporter:
+    """
+    Импорт рецептов из строк JSONL пачками по batch_size.
+    Строки с ошибками пропускаются и попадают в errors.
+    """
+
+    def __init__(self, default_author=None, batch_size=BATCH_SIZE,
+                 workers=WORKERS):
+        self.default_author = default_author
+        self.batch_size = batch_size
+        self.workers = workers
+        self.tags = dict(Tag.objects.values_list('name', 'id'))
+        self.ingredients = {
+            (name, unit): pk for pk, name, unit in
+            Ingredient.objects.values_list('id', 'name', 'measurement_unit')
+        }
+        self.created = 0
+        self.errors = []
+
+    def run(self, lines):
+        with ThreadPoolExecutor(self.workers) as executor:
+            batch = []
+            for number, line in enumerate(lines, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    batch.append((number, self.parse(line)))
+                except RecordError as error:
+                    self.errors.append((number, str(error)))
+                if len(batch) >= self.batch_size:
+                    self.save_batch(batch, executor)
+                    batch = []
+            if batch:
+                self.save_batch(batch, executor)
+        return self.created
+
+    def parse(self, line):
+        try:
+            record = loads(line)
+        except ValueError:
+            raise RecordError('Строка не является JSON.')
+        if not isinstance(record, dict):
+            raise RecordError('Строка должна содержать объект.')
+        tags = record.get('tags')
+        ingredients = record.get('ingredients')
+        if not tags or not isinstance(tags, list):
+            raise RecordError('Необходимо указать как минимум 1 тег.')
+        if not ingredients or not isinstance(ingredients, list):
+            raise RecordError('Необходимо указать как минимум 1 ингредиент.')
+        try:
+            tag_ids = {self.tags[name] for name in tags}
+        except (KeyError, TypeError):
+            raise RecordError(f'Неизвестный тег в {tags!r}.')
+        amounts = {}
+        for ingredient in ingredients:
+            if not isinstance(ingredient, dict):
+                raise RecordError('Ингредиент должен быть объектом.')
+            key = (ingredient.get('name'), ingredient.get('measurement_unit'))
+            if not all(isinstance(part, str) for part in key) or (
+                key not in self.ingredients
+            ):
+                raise RecordError(f'Неизвестный ингредиент {key!r}.')
+            if self.ingredients[key] in amounts:
+                raise RecordError('Ингредиенты не должны повторяться.')
+            amounts[self.ingredients[key]] = get_int(ingredient, 'amount', 1)
+        author = record.get('author')
+        if author is not None and not isinstance(author, str):
+            raise RecordError('Автор указывается по email.')
+        pub_date = record.get('pub_date')
+        if pub_date is not None:
+            pub_date = parse_datetime(str(pub_date))
+            if pub_date is None:
+                raise RecordError('Неверный формат pub_date.')
+        return {
+            'author': author,
+            'name': get_str(record, 'name', 200),
+            'text': get_str(record, 'text'),
+            'cooking_time': get_int(record, 'cooking_time', 1, 480),
+            'image': get_str(record, 'image'),
+            'pub_date': pub_date,
+            'tags': tag_ids,
+            'ingredients': amounts,
+        }
+
+    def get_authors(self, batch):
+        emails = {record['author'] for _, record in batch if record['author']}
+        authors = dict(User.objects.filter(
+            email__in=emails,
+        ).values_list('email', 'id')) if emails else {}
+        for number, record in batch:
+            if not record['author']:
+                if self.default_author is None:
+                    self.errors.append((number, 'Не указан автор.'))
+                    continue
+                yield number, record, self.default_author.id
+            elif record['author'] in authors:
+                yield number, record, authors[record['author']]
+            else:
+                self.errors.append(
+                    (number, f'Неизвестный автор {record["author"]}.')
+                )
+
+    def save_batch(self, batch, executor):
+        batch = list(self.get_authors(batch))
+        # Изображения проверяются и пишутся параллельно,
+        # только для строк без других ошибок.
+        images = executor.map(
+            store_image, [record['image'] for _, record, _ in batch],
+        )
+        recipes = []
+        records = []
+        for (number, record, author_id), image in zip(batch, images):
+            if isinstance(image, RecordError):
+                self.errors.append((number, str(image)))
+                continue
+            recipes.append(Recipe(
+                author_id=author_id, name=record['name'], text=record['text'],
+                cooking_time=record['cooking_time'], image=image,
+            ))
+            records.append(record)
+        if not recipes:
+            return
+
+        with transaction.atomic():
+            Recipe.objects.bulk_create(recipes)
+            if recipes[0].pk is None:
+                # SQLite не возвращает id из bulk_create, а запись
+                # блокирует всю БД, поэтому последние id - наши.
+                ids = Recipe.objects.order_by('-id').values_list(
+                    'id', flat=True,
+                )[:len(recipes)]
+                for recipe, pk in zip(recipes, reversed(ids)):
+                    recipe.pk = pk
+            # pub_date заполняется при создании, дата из файла - отдельно.
+            dated = []
+            for recipe, record in zip(recipes, records):
+                if record['pub_date'] is not None:
+                    recipe.pub_date = record['pub_date']
+                    dated.append(recipe)
+            if dated:
+                Recipe.objects.bulk_update(dated, ('pub_date',))
+            RecipeTag.objects.bulk_create(
+                RecipeTag(recipe_id=recipe.pk, tag_id=tag_id)
+                for recipe, record in zip(recipes, records)
+                for tag_id in record['tags']
+            )
+            IngredientAmount.objects.bulk_create(
+                IngredientAmount(
+                    recipe_id=recipe.pk, ingredients_id=ingredient_id,
+                    amount=amount,
+                )
+                for recipe, record in zip(recipes, records)
+                for ingredient_id, amount in record['ingredients'].items()
+            )
+        self.created += len(recipes)
+
+
+def iterate_chunks(queryset, chunk_size, *lookups):
+    """
+    Объекты queryset пачками по chunk_size. Строки читаются курсором
+    на стороне сервера, prefetch_related выполняется для каждой пачки.
+    """
+    objects = queryset.iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(objects, chunk_size))
+        if not chunk:
+            return
+        prefetch_related_objects(chunk, *lookups)
+        yield chunk
+
+
+def read_image(name):
+    try:
+        with Recipe._meta.get_field('image').storage.open(name, 'rb') as file:
+            content = file.read()
+    except OSError:
+        return None
+    extension = name.rsplit('.', 1)[-1].lower()
+    return (
+        f'data:image/{"jpeg" if extension == "jpg" else extension};base64,'
+        + base64.b64encode(content).decode()
+    )
+
+
+def export_recipes(queryset, chunk_size=BATCH_SIZE, workers=WORKERS):
+    """Строки JSONL с рецептами в формате RecipeImporter."""
+    queryset = queryset.select_related('author').order_by('id')
+    with ThreadPoolExecutor(workers) as executor:
+        for chunk in iterate_chunks(queryset, chunk_size, *RECIPE_PREFETCH):
+            images = executor.map(
+                read_image, [recipe.image.name for recipe in chunk],
+            )
+            for recipe, image in zip(chunk, images):
+                yield dumps({
+                    'author': recipe.author.email,
+                    'name': recipe.name,
+                    'text': recipe.text,
+                    'cooking_time': recipe.cooking_time,
+                    'pub_date': recipe.pub_date.isoformat(),
+                    'tags': [tag.name for tag in recipe.tags.all()],
+                    'ingredients': [
+                        {
+                            'name': amount.ingredients.name,
+                            'measurement_unit':
+                                amount.ingredients.measurement_unit,
+                            'amount': amount.amount,
+                        }
+                        for amount in recipe.am_ingredients.all()
+                    ],
+                    'image': image,
+                }) + b'\n'
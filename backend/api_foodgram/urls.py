@@ -1,8 +1,11 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework import routers
 
-from .views import (IngredientViewSet, FollowListView, FollowCreateView,
-                    RecipeViewSet, TagViewSet, CustomUserViewSet)
+from .async_views import async_urls
+from .views import (IngredientViewSet, FeedView, FollowListView,
+                    FollowCreateView, MealPlanViewSet, RecipeViewSet,
+                    TagViewSet, CustomUserViewSet)
 
 router_api = routers.DefaultRouter()
 
@@ -10,12 +13,24 @@ router_api.register(r'ingredients', IngredientViewSet, basename='ingredients')
 router_api.register(r'recipes', RecipeViewSet, basename='recipes')
 router_api.register(r'tags', TagViewSet, basename='tags')
 router_api.register(r'users', CustomUserViewSet, basename='users')
+router_api.register(r'meal_plans', MealPlanViewSet, basename='meal_plans')
+
+api_urls = [
+    path(
+        'users/subscriptions/', FollowListView.as_view(),
+        name='subscriptions',
+    ),
+    path('users/<int:user_id>/subscribe/', FollowCreateView.as_view()),
+    path('recipes/feed/', FeedView.as_view(), name='feed'),
+    *router_api.urls,
+]
+
+if settings.ASYNC_VIEWS:
+    api_urls = async_urls(api_urls)
 
 
 urlpatterns = [
-    path('users/subscriptions/', FollowListView.as_view()),
-    path('users/<int:user_id>/subscribe/', FollowCreateView.as_view()),
-    path('', include(router_api.urls)),
+    path('', include(api_urls)),
     path('', include('djoser.urls')),
     path('auth/', include('djoser.urls.authtoken')),
 ]
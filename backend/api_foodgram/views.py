@@ -1,51 +1,84 @@
-from django.db.models import Sum
+import datetime
+
 from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import (Count, Exists, OuterRef, Prefetch, Subquery,
+                              Sum)
+from django.http import Http404, StreamingHttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
-from django.http import HttpResponse
 from django.shortcuts import get_object_or_404
 from djoser.views import UserViewSet
-from reportlab.pdfgen import canvas
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
 from rest_framework import generics, permissions, status, viewsets
 from rest_framework.decorators import action
-from rest_framework.permissions import (IsAuthenticated,
+from rest_framework.permissions import (IsAdminUser, IsAuthenticated,
                                         IsAuthenticatedOrReadOnly)
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from recipes.models import (Cart, Favorite, Ingredient, IngredientAmount,
-                            Recipe, Tag)
+                            MealPlan, MealPlanDay, MealPlanRecipe, Recipe,
+                            Tag)
 from users.models import Follow, User
+from .cache import (AUTHOR_FIELDS, RECIPE_PREFETCH, RECIPE_QUERYSET,
+                    get_cached_recipe, get_profile_key)
+from .conditional import get_etag, get_if_match_versions
+from .db import route_like_request
+from .downloads import shopping_list_response
+from .feed import (add_author, fan_out_recipe, get_feed, get_page_recipes,
+                   remove_author)
 from .filters import IngredientsFilter, RecipeFilters
-from .paginations import CustomPagination
+from .instrumentation import InstrumentedViewMixin
+from .meal_plans import annotate_state, get_plan_ingredients, plan_changed
+from .paginations import CustomPagination, FeedPagination
+from .parsers import NDJSONParser
 from .permissions import (IsAdminOrReadOnly, IsAuthor,
                           IsAuthorOrAdminOrReadOnly, IsAuthForUsers)
 from .serializers import (CartSerializer, CustomUserSerializer,
                           FavoriteSerializer, FollowSerializer,
-                          IngredientSerializer, RecipeCreateSerializer,
-                          RecipeListSerializer, TagSerializer)
+                          IngredientSerializer, MealPlanRecipeSerializer,
+                          MealPlanSerializer, RecipeCreateSerializer,
+                          RecipeReadSerializer, RecipeShortListSerializer,
+                          TagSerializer)
+from .transfer import (RecipeImporter, check_streaming, dumps, export_recipes,
+                       iterate_chunks)
 
 
-class CustomUserViewSet(UserViewSet):
+class CustomUserViewSet(InstrumentedViewMixin, UserViewSet):
     """ Viewset для пользователей."""
     queryset = User.objects.all()
     serializer_class = CustomUserSerializer
     permission_classes = (IsAuthForUsers,)
     pagination_class = CustomPagination
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ('list', 'retrieve'):
+            # Список упорядочен по username, его обслуживает
+            # уникальный индекс этого поля.
+            queryset = queryset.only('id', *AUTHOR_FIELDS)
+        user = self.request.user
+        if user.is_authenticated:
+            return queryset.annotate(is_subscribed=Exists(
+                Follow.objects.filter(author=OuterRef('pk'), follower=user)
+            ))
+        return queryset
+
     @action(
         detail=False, methods=['get'], url_path='me',
         permission_classes=[IsAuthenticated]
     )
     def me(self, request):
-        serializer = CustomUserSerializer(request.user)
-        return Response(
-            serializer.data, status=status.HTTP_200_OK,
-        )
+        """Профиль из кеша, сбрасывается при изменении пользователя."""
+        key = get_profile_key(request.user.pk)
+        data = cache.get(key)
+        if data is None:
+            data = dict(CustomUserSerializer(request.user).data)
+            cache.set(key, data, settings.PROFILE_CACHE_TIMEOUT)
+        return Response(data, status=status.HTTP_200_OK)
 
 
-class TagViewSet(viewsets.ModelViewSet):
+class TagViewSet(InstrumentedViewMixin, viewsets.ModelViewSet):
     """
     Viewset для получения списка тегов
     или конкретного тега любым пользователем.
@@ -56,7 +89,7 @@ class TagViewSet(viewsets.ModelViewSet):
     pagination_class = None
 
 
-class IngredientViewSet(viewsets.ModelViewSet):
+class IngredientViewSet(InstrumentedViewMixin, viewsets.ModelViewSet):
     """
     Viewset для получения списка ингредиентов
     или конкретного ингредиента любым пользователем.
@@ -67,23 +100,58 @@ class IngredientViewSet(viewsets.ModelViewSet):
     filter_backends = (IngredientsFilter,)
     search_fields = ('^name',)
     pagination_class = None
+    throttle_scopes = {'list': 'search'}
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(InstrumentedViewMixin, viewsets.ModelViewSet):
     """ Viewset для рецептов, включая избранное и список покупок."""
-    queryset = Recipe.objects.all()
+    queryset = RECIPE_QUERYSET
     permission_classes = (IsAuthenticatedOrReadOnly,)
     pagination_class = CustomPagination
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilters
+    # Области ограничения частоты запросов по действиям.
+    throttle_scopes = {
+        'list': 'search',
+        'export': 'search',
+        'create': 'recipe_write',
+        'update': 'recipe_write',
+        'partial_update': 'recipe_write',
+        'download_shopping_cart': 'download',
+    }
 
     def get_serializer_class(self):
         if self.request.method in permissions.SAFE_METHODS:
-            return RecipeListSerializer
+            return RecipeReadSerializer
         return RecipeCreateSerializer
 
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user)
+        fan_out_recipe(serializer.save(author=self.request.user))
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action in ('update', 'partial_update'):
+            context['if_match_versions'] = get_if_match_versions(
+                self.request, self.kwargs[self.lookup_field],
+            )
+        return context
+
+    def retrieve(self, request, *args, **kwargs):
+        recipe = self.get_object()
+        serializer = self.get_serializer(recipe)
+        return Response(serializer.data, headers={'ETag': get_etag(recipe)})
+
+    def perform_update(self, serializer):
+        self.headers['ETag'] = get_etag(serializer.save())
+
+    def get_object(self):
+        """
+        Рецепт из кеша объектов. Права на объект сверяют author_id,
+        поэтому проверка не требует запросов к БД.
+        """
+        recipe = get_cached_recipe(self.kwargs[self.lookup_field])
+        self.check_object_permissions(self.request, recipe)
+        return recipe
 
     def get_permissions(self):
         if self.action == 'partial_update' or self.action == 'destroy':
@@ -112,9 +180,10 @@ class RecipeViewSet(viewsets.ModelViewSet):
     def perform_delete_action(
         self, request, recipe, model, errors_message
     ):
-        model_object = model.objects.filter(recipe=recipe)
-        if model_object.exists():
-            model_object.delete()
+        deleted, _ = model.objects.filter(
+            recipe=recipe, author=request.user,
+        ).delete()
+        if deleted:
             return Response(
                 status=status.HTTP_204_NO_CONTENT,
             )
@@ -125,10 +194,10 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
     @action(
         detail=True, methods=['post', 'delete'], url_path='favorite',
-        permission_classes=[IsAuthor]
+        permission_classes=[IsAuthenticated]
     )
     def favorite(self, request, pk):
-        recipe = get_object_or_404(Recipe, id=pk)
+        recipe = self.get_object()
 
         if request.method == 'POST':
             return self.perform_create_action(
@@ -144,10 +213,10 @@ class RecipeViewSet(viewsets.ModelViewSet):
 
     @action(
         detail=True, methods=['post', 'delete'], url_path='shopping_cart',
-        permission_classes=[IsAuthor]
+        permission_classes=[IsAuthenticated]
     )
     def shopping_cart(self, request, pk):
-        recipe = get_object_or_404(Recipe, id=pk)
+        recipe = self.get_object()
 
         if request.method == 'POST':
             return self.perform_create_action(
@@ -161,52 +230,223 @@ class RecipeViewSet(viewsets.ModelViewSet):
             'Рецепт не был добавлен в список покупок',
         )
 
+    @action(detail=True, methods=['get'], url_path='similar')
+    def similar(self, request, pk):
+        recipe = self.get_object()
+        recipes = Recipe.objects.filter(
+            similar_to__recipe=recipe,
+        ).order_by('-similar_to__score').only(
+            'id', 'name', 'image', 'cooking_time',
+        )
+        serializer = RecipeShortListSerializer(
+            recipes, many=True, context={'request': request},
+        )
+        return Response(serializer.data)
+
+    def stream_recipes(self, queryset):
+        for chunk in iterate_chunks(
+            queryset, settings.EXPORT_CHUNK_SIZE, *RECIPE_PREFETCH,
+        ):
+            # Отметки пользователя загружаются на пачку целиком.
+            serializer = self.get_serializer(chunk, many=True)
+            yield b''.join(dumps(recipe) + b'\n' for recipe in serializer.data)
+
+    @action(detail=False, methods=['get'], url_path='export')
+    def export(self, request):
+        """
+        Все рецепты, подходящие под фильтры списка, в NDJSON
+        без пагинации. Память не зависит от числа рецептов.
+        """
+        check_streaming(request)
+        queryset = self.filter_queryset(self.get_queryset())
+        return StreamingHttpResponse(
+            route_like_request(self.stream_recipes(queryset)),
+            content_type='application/x-ndjson',
+        )
+
+    @action(
+        detail=False, methods=['get', 'post'], url_path='bulk',
+        permission_classes=[IsAdminUser], parser_classes=[NDJSONParser],
+    )
+    def bulk(self, request):
+        """
+        Резервная копия всех рецептов в JSONL (GET) и пакетный
+        импорт из NDJSON в теле запроса (POST).
+        """
+        if request.method == 'GET':
+            check_streaming(request)
+            response = StreamingHttpResponse(
+                export_recipes(Recipe.objects.all()),
+                content_type='application/x-ndjson',
+            )
+            response['Content-Disposition'] = (
+                'attachment;filename="recipes.jsonl"'
+            )
+            return response
+
+        importer = RecipeImporter(default_author=request.user)
+        importer.run(request.data)
+        return Response({
+            'created': importer.created,
+            'errors': [
+                {'line': number, 'error': error}
+                for number, error in sorted(importer.errors)
+            ],
+        }, status=status.HTTP_200_OK)
+
     @action(
         detail=False, methods=['get'], url_path='download_shopping_cart',
         permission_classes=[IsAuthor]
     )
     def download_shopping_cart(self, request):
-        pdfmetrics.registerFont(TTFont(
-            'Lato-Light', f'{settings.BASE_DIR}/data/lato-light.ttf', 'UTF-8'
-        ))
-
         ingredients = IngredientAmount.objects.filter(
             recipe__recipe_in_cart__author=request.user
         ).values_list(
             'ingredients__name', 'ingredients__measurement_unit',
         ).annotate(amount=Sum('amount'))
 
-        response = HttpResponse(content_type='application/pdf')
-        response['Content-Disposition'] = ('attachment;'
-                                           'filename="shopping_cart.pdf"')
-        page = canvas.Canvas(response)
-        page.setFont("Lato-Light", 15)
-
-        indent = 800
-        for _, ingredient in enumerate(ingredients, start=1):
-            page.drawString(
-                50, indent, (f'{ingredient[0]}: '
-                             f'{ingredient[2]} '
-                             f'{ingredient[1]}')
+        return shopping_list_response(ingredients, 'shopping_cart.pdf')
+
+
+class MealPlanViewSet(InstrumentedViewMixin, viewsets.ModelViewSet):
+    """ Viewset для планов питания юзера и списка покупок по плану."""
+    serializer_class = MealPlanSerializer
+    permission_classes = (IsAuthenticated,)
+    pagination_class = CustomPagination
+    throttle_scopes = {'download_shopping_list': 'download'}
+
+    def get_queryset(self):
+        queryset = MealPlan.objects.filter(author=self.request.user)
+        if self.action in (
+            'plan_recipe', 'shopping_list', 'download_shopping_list',
+        ):
+            return annotate_state(queryset)
+        return queryset.prefetch_related(Prefetch(
+            'days', queryset=MealPlanDay.objects.prefetch_related(Prefetch(
+                'recipes',
+                queryset=MealPlanRecipe.objects.select_related('recipe'),
+            )),
+        ))
+
+    def perform_create(self, serializer):
+        serializer.save(author=self.request.user)
+
+    @action(
+        detail=True, methods=['post', 'patch', 'delete'],
+        url_path=r'days/(?P<date>\d{4}-\d{2}-\d{2})/recipes/'
+                 r'(?P<recipe_id>\d+)',
+    )
+    def plan_recipe(self, request, pk, date, recipe_id):
+        """Рецепт в дне плана: добавление, число порций и удаление."""
+        plan = self.get_object()
+        try:
+            day = datetime.date.fromisoformat(date)
+        except ValueError:
+            raise Http404
+        recipe = get_cached_recipe(recipe_id)
+
+        if request.method == 'POST':
+            serializer = MealPlanRecipeSerializer(
+                data=request.data, context=self.get_serializer_context(),
+            )
+            serializer.is_valid(raise_exception=True)
+            with transaction.atomic():
+                plan_day, _ = MealPlanDay.objects.get_or_create(
+                    plan=plan, date=day,
+                )
+                if MealPlanRecipe.objects.filter(
+                    day=plan_day, recipe=recipe,
+                ).exists():
+                    return Response(
+                        {'errors': 'Рецепт уже есть в этом дне плана'},
+                        status=status.HTTP_400_BAD_REQUEST,
+                    )
+                entry = serializer.save(day=plan_day, recipe=recipe)
+                plan_changed(plan, recipe, entry.servings, 1)
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+        entry = get_object_or_404(
+            MealPlanRecipe, day__plan=plan, day__date=day, recipe=recipe,
+        )
+        if request.method == 'PATCH':
+            servings = entry.servings
+            serializer = MealPlanRecipeSerializer(
+                entry, data=request.data, partial=True,
+                context=self.get_serializer_context(),
             )
-            indent -= 20
+            serializer.is_valid(raise_exception=True)
+            with transaction.atomic():
+                entry = serializer.save()
+                plan_changed(plan, recipe, entry.servings - servings)
+            return Response(serializer.data)
+
+        with transaction.atomic():
+            entry.delete()
+            # Пустой день из плана убирается.
+            MealPlanDay.objects.filter(
+                pk=entry.day_id, recipes__isnull=True,
+            ).delete()
+            plan_changed(plan, recipe, -entry.servings, -1)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(detail=True, methods=['get'], url_path='shopping_list')
+    def shopping_list(self, request, pk):
+        return Response([
+            {'name': name, 'measurement_unit': unit, 'amount': amount}
+            for name, unit, amount in get_plan_ingredients(self.get_object())
+        ])
+
+    @action(detail=True, methods=['get'], url_path='download_shopping_list')
+    def download_shopping_list(self, request, pk):
+        return shopping_list_response(
+            get_plan_ingredients(self.get_object()), 'meal_plan.pdf',
+        )
+
 
-        page.showPage()
-        page.save()
-        return response
+class FeedView(InstrumentedViewMixin, generics.ListAPIView):
+    """View-класс для ленты рецептов авторов из подписок."""
+    serializer_class = RecipeReadSerializer
+    permission_classes = (IsAuthenticated,)
+    pagination_class = FeedPagination
+
+    def get_queryset(self):
+        return get_feed(self.request.user)
 
+    def list(self, request, *args, **kwargs):
+        page = self.paginate_queryset(self.get_queryset())
+        serializer = self.get_serializer(get_page_recipes(page), many=True)
+        return self.get_paginated_response(serializer.data)
 
-class FollowListView(generics.ListAPIView):
+
+class FollowListView(InstrumentedViewMixin, generics.ListAPIView):
     """View-класс для получения списка подписок."""
     serializer_class = FollowSerializer
     permission_classes = (IsAuthenticated,)
     pagination_class = CustomPagination
 
     def get_queryset(self):
-        return Follow.objects.filter(follower=self.request.user)
+        recipes = Recipe.objects.only(
+            'id', 'name', 'image', 'cooking_time', 'author_id',
+        )
+        recipes_limit = self.request.query_params.get('recipes_limit', '')
+        if recipes_limit.isdigit():
+            # Из БД читается не больше recipes_limit последних рецептов
+            # автора, подзапрос идёт по индексу (author, -pub_date).
+            recipes = recipes.filter(id__in=Subquery(
+                Recipe.objects.filter(
+                    author_id=OuterRef('author_id'),
+                ).order_by('-pub_date').values('id')[:int(recipes_limit)]
+            ))
+        return Follow.objects.filter(
+            follower=self.request.user
+        ).select_related('author').annotate(
+            recipes_count=Count('author__recipes'),
+        ).order_by('-pub_date').prefetch_related(
+            Prefetch('author__recipes', queryset=recipes),
+        )
 
 
-class FollowCreateView(APIView):
+class FollowCreateView(InstrumentedViewMixin, APIView):
     """ View-класс для создания и удаления подписки."""
     permission_classes = (IsAuthenticated,)
 
@@ -227,6 +467,7 @@ class FollowCreateView(APIView):
         )
         serializer.is_valid(raise_exception=True)
         serializer.save(author=author, follower=self.request.user)
+        add_author(request.user.id, author.id)
         return Response(
             serializer.data, status=status.HTTP_201_CREATED,
         )
@@ -236,6 +477,7 @@ class FollowCreateView(APIView):
         subscribe = Follow.objects.filter(author=author, follower=request.user)
         if subscribe.exists():
             subscribe.delete()
+            remove_author(request.user.id, author.id)
             return Response(
                 status=status.HTTP_204_NO_CONTENT,
             )
@@ -0,0 +1,53 @@
+import asyncio
+import logging
+import time
+
+from asgiref.sync import async_to_sync
+from django.db import connections
+from django.test import RequestFactory
+from django.urls import resolve, reverse
+
+from .downloads import register_fonts
+
+logger = logging.getLogger(__name__)
+
+# Справочники, которые запрашивает каждая страница фронтенда.
+WARMUP_URL_NAMES = ('tags-list', 'ingredients-list')
+
+
+def prepare():
+    """
+    Подготовка в мастер-процессе gunicorn до fork: всё, что
+    загружается здесь, воркеры получают готовым.
+    """
+    register_fonts()
+    # Соединения с БД не должны переходить в воркеры.
+    connections.close_all()
+
+
+def warm_up():
+    """
+    Прогрев воркера до приёма запросов: соединения с БД
+    и первые запросы к справочникам через DRF-представления.
+    """
+    started = time.perf_counter()
+    register_fonts()
+    for connection in connections.all():
+        connection.ensure_connection()
+    factory = RequestFactory()
+    for name in WARMUP_URL_NAMES:
+        path = reverse(name)
+        match = resolve(path)
+        view = match.func
+        if asyncio.iscoroutinefunction(view):
+            view = async_to_sync(view)
+        # Ошибка прогрева не должна останавливать воркер.
+        try:
+            response = view(factory.get(path), *match.args, **match.kwargs)
+            if hasattr(response, 'render'):
+                response.render()
+        except Exception:
+            logger.exception('Не удалось прогреть %s', path)
+    logger.info(
+        'Воркер прогрет за %.1f мс', (time.perf_counter() - started) * 1000
+    )
@@ -0,0 +1,153 @@
+"""
+Согласованность кеша рецептов с БД.
+
+Основная БД и реплика - два файла SQLite, реплика - копия основной
+на момент заполнения, то есть отстаёт от всех последующих записей.
+Проверяется, что после фиксации изменения кеш отдаёт новый рецепт,
+даже если параллельный запрос, отставшая реплика или другой воркер
+успели прочитать прежний:
+    python benchmarks/cache_consistency.py
+"""
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram_backend.settings')
+
+import django  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+DIRECTORY = tempfile.mkdtemp()
+settings.DATABASES = {
+    alias: {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(DIRECTORY, f'{alias}.sqlite3'),
+    }
+    for alias in ('default', 'replica_0')
+}
+settings.DATABASE_REPLICAS = ['replica_0']
+# Реплики требуют общего для процессов кеша.
+settings.CACHES = {'default': {
+    'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+    'LOCATION': os.path.join(DIRECTORY, 'cache'),
+}}
+settings.MEDIA_ROOT = os.path.join(DIRECTORY, 'media')
+
+django.setup()
+
+from django.core.cache import cache  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.db import connections, transaction  # noqa: E402
+from django.test.utils import CaptureQueriesContext  # noqa: E402
+
+from api_foodgram.cache import (ALL_RECIPES, get_cached_recipe,  # noqa: E402
+                                get_recipe_key, get_version_key)
+from api_foodgram.db import use_replica  # noqa: E402
+from recipes.models import Recipe  # noqa: E402
+
+
+def read_concurrently(recipe):
+    """
+    То, что делает параллельный запрос, пока изменение рецепта
+    не зафиксировано: берёт текущие версии и кладёт в кеш рецепт,
+    прочитанный до изменения.
+    """
+    versions = cache.get_many(
+        (get_version_key(recipe.id), get_version_key(ALL_RECIPES))
+    )
+    cache.set(get_recipe_key(
+        recipe.id,
+        versions.get(get_version_key(recipe.id), 0),
+        versions.get(get_version_key(ALL_RECIPES), 0),
+    ), recipe)
+
+
+def check_transaction(errors):
+    recipe = Recipe.objects.first()
+    old = get_cached_recipe(recipe.id)
+    with transaction.atomic():
+        recipe.name = 'Изменено в транзакции'
+        recipe.save()
+        read_concurrently(old)
+    name = get_cached_recipe(recipe.id).name
+    if name != recipe.name:
+        errors.append(f'после фиксации в кеше прежний рецепт: {name}')
+
+
+def check_replica_lag(errors):
+    recipe = Recipe.objects.last()
+    recipe.name = 'Нет на реплике'
+    recipe.save()
+    token = use_replica.set(True)
+    try:
+        with CaptureQueriesContext(connections['replica_0']) as queries:
+            name = get_cached_recipe(recipe.id).name
+    finally:
+        use_replica.reset(token)
+    if name != recipe.name:
+        errors.append(f'в кеш попал рецепт с реплики: {name}')
+    if queries:
+        errors.append(f'{len(queries)} SQL-запросов к реплике при заполнении')
+
+
+def serve(pipe):
+    """Другой воркер: отдаёт название рецепта из кеша по id."""
+    for recipe_id in iter(pipe.recv, None):
+        pipe.send(get_cached_recipe(recipe_id).name)
+
+
+def check_workers(errors):
+    recipe = Recipe.objects.first()
+    connections.close_all()
+    pipe, worker_pipe = multiprocessing.Pipe()
+    worker = multiprocessing.get_context('fork').Process(
+        target=serve, args=(worker_pipe,),
+    )
+    worker.start()
+    try:
+        pipe.send(recipe.id)
+        pipe.recv()
+        recipe.name = 'Изменено в другом воркере'
+        recipe.save()
+        pipe.send(recipe.id)
+        name = pipe.recv()
+    finally:
+        pipe.send(None)
+        worker.join()
+    if name != recipe.name:
+        errors.append(f'другой воркер отдаёт прежний рецепт: {name}')
+
+
+def main():
+    errors = []
+    try:
+        call_command('migrate', verbosity=0)
+        call_command(
+            'seed_data', stdout=StringIO(), users=3, recipes=2,
+            favorites=0, cart=0, follows=0,
+        )
+        connections.close_all()
+        shutil.copy(
+            settings.DATABASES['default']['NAME'],
+            settings.DATABASES['replica_0']['NAME'],
+        )
+        check_transaction(errors)
+        check_replica_lag(errors)
+        check_workers(errors)
+    finally:
+        connections.close_all()
+        shutil.rmtree(DIRECTORY)
+    if errors:
+        print('\n'.join(errors), file=sys.stderr)
+        sys.exit(1)
+    print('кеш рецептов согласован с БД')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""
+Проверка условного изменения рецепта по If-Match.
+
+Изменение с ETag прежней версии отклоняется с 412, с текущим ETag,
+с * и без заголовка проходит. Если рецепт в кеше отстал от БД,
+он загружается заново через select_for_update, и решение принимается
+по версии из БД. Кеш общий для процессов, как в docker-compose:
+    python benchmarks/conditional_update.py
+"""
+import os
+import shutil
+import sys
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram_backend.settings')
+
+import django  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+DIRECTORY = tempfile.mkdtemp()
+settings.DATABASES = {'default': {
+    'ENGINE': 'django.db.backends.sqlite3',
+    'NAME': os.path.join(DIRECTORY, 'default.sqlite3'),
+}}
+settings.DATABASE_REPLICAS = []
+settings.CACHES = {'default': {
+    'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+    'LOCATION': os.path.join(DIRECTORY, 'cache'),
+}}
+settings.MEDIA_ROOT = os.path.join(DIRECTORY, 'media')
+
+django.setup()
+
+from django.core.management import call_command  # noqa: E402
+from django.db import connections  # noqa: E402
+from django.db.models import F, QuerySet  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+from rest_framework.authtoken.models import Token  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+
+from api_foodgram.cache import get_cached_recipe  # noqa: E402
+from api_foodgram.conditional import get_etag  # noqa: E402
+from recipes.models import Recipe  # noqa: E402
+
+
+class Updates:
+    """Изменяет рецепт от имени автора и сверяет ответы."""
+
+    def __init__(self, recipe):
+        self.errors = []
+        self.url = f'/api/recipes/{recipe.id}/'
+        self.client = APIClient()
+        token, _ = Token.objects.get_or_create(user=recipe.author)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        self.data = {
+            'ingredients': [
+                {'id': row.ingredients_id, 'amount': row.amount}
+                for row in recipe.am_ingredients.all()
+            ],
+            'tags': [tag.id for tag in recipe.tags.all()],
+        }
+
+    def patch(self, name, if_match, status):
+        """Возвращает ETag ответа, если он пришёл."""
+        headers = {} if if_match is None else {'HTTP_IF_MATCH': if_match}
+        response = self.client.patch(
+            self.url, {**self.data, 'name': name}, format='json', **headers,
+        )
+        if response.status_code != status:
+            self.errors.append(
+                f'{name}: HTTP {response.status_code} вместо {status}'
+            )
+        return response.get('ETag')
+
+    def check_name(self, name):
+        actual = Recipe.objects.get(pk=self.url.split('/')[-2]).name
+        if actual != name:
+            self.errors.append(f'в БД «{actual}» вместо «{name}»')
+
+
+def run_checks(updates, recipe):
+    etag = updates.client.get(updates.url)['ETag']
+    current = updates.patch('С текущим ETag', etag, 200)
+    if current == etag:
+        updates.errors.append('ETag не изменился после изменения рецепта')
+    updates.patch('С прежним ETag', etag, 412)
+    updates.check_name('С текущим ETag')
+    updates.patch('С другим рецептом', f'"0-{recipe.version}"', 412)
+    updates.patch('Любая версия', '*', 200)
+    updates.patch('Без заголовка', None, 200)
+
+    # Рецепт меняется в обход сигналов: в кеше остаётся прежняя версия.
+    cached = get_cached_recipe(recipe.id)
+    Recipe.objects.filter(pk=recipe.id).update(version=F('version') + 1)
+    stored = Recipe.objects.get(pk=recipe.id)
+    updates.patch('С ETag из кеша', get_etag(cached), 412)
+    with mock.patch.object(
+        QuerySet, 'select_for_update', autospec=True,
+        side_effect=QuerySet.select_for_update,
+    ) as select_for_update:
+        etag = updates.patch('С ETag из БД', get_etag(stored), 200)
+    if not select_for_update.called:
+        updates.errors.append('рецепт из кеша не загружен заново')
+    stored.refresh_from_db()
+    if etag != get_etag(stored):
+        updates.errors.append(f'ETag {etag} вместо {get_etag(stored)}')
+    updates.check_name('С ETag из БД')
+
+
+def main():
+    setup_test_environment()
+    try:
+        call_command('migrate', verbosity=0)
+        call_command(
+            'seed_data', stdout=StringIO(), users=2, recipes=1,
+            favorites=0, cart=0, follows=0,
+        )
+        recipe = Recipe.objects.first()
+        updates = Updates(recipe)
+        run_checks(updates, recipe)
+    finally:
+        connections.close_all()
+        shutil.rmtree(DIRECTORY)
+    if updates.errors:
+        print('\n'.join(updates.errors), file=sys.stderr)
+        sys.exit(1)
+    print('условное изменение рецептов верно')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""
+Бенчмарк ключевых эндпоинтов API на текущей БД.
+
+Данные создаются командой seed_data:
+    python manage.py seed_data --users 1000 --recipes 20
+    python benchmarks/endpoints.py --repeat 30 > before.json
+
+Отчёт в JSON: p50/p95 в миллисекундах и число SQL-запросов
+для каждого эндпоинта, чтобы сравнивать прогоны между коммитами.
+"""
+import argparse
+import itertools
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram_backend.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.db.models import Count  # noqa: E402
+from django.test.utils import (CaptureQueriesContext,  # noqa: E402
+                               override_settings, setup_test_environment)
+from rest_framework.authtoken.models import Token  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+
+from recipes.models import Ingredient, Recipe, Tag  # noqa: E402
+from users.models import User  # noqa: E402
+
+
+def get_endpoints():
+    recipe = Recipe.objects.order_by('?').first()
+    slugs = list(Tag.objects.values_list('slug', flat=True)[:2])
+    prefix = Ingredient.objects.order_by('?').first().name[:2]
+    filters = itertools.product(
+        ('', 'is_favorited=1'),
+        ('', 'is_in_shopping_cart=1'),
+        ('', f'author={recipe.author_id}'),
+        ('', f'tags={slugs[0]}', '&'.join(f'tags={slug}' for slug in slugs)),
+    )
+    endpoints = {
+        'recipes?' + '&'.join(filter(None, combination)):
+            '/api/recipes/?' + '&'.join(filter(None, combination))
+        for combination in filters
+    }
+    endpoints.update({
+        'recipe_detail': f'/api/recipes/{recipe.id}/',
+        'subscriptions': '/api/users/subscriptions/?recipes_limit=3',
+        'ingredients_search': f'/api/ingredients/?name={prefix}',
+        'ingredients_all': '/api/ingredients/',
+        'tags': '/api/tags/',
+        'users': '/api/users/',
+        'users_me': '/api/users/me/',
+        'download_shopping_cart': '/api/recipes/download_shopping_cart/',
+    })
+    return endpoints
+
+
+def measure(client, url, repeat):
+    timings = []
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = client.get(url)
+            if response.streaming:
+                b''.join(response.streaming_content)
+            timings.append((time.perf_counter() - started) * 1000)
+        if response.status_code != 200:
+            raise RuntimeError(f'{url}: HTTP {response.status_code}')
+    timings.sort()
+    return {
+        'p50_ms': round(statistics.median(timings), 2),
+        'p95_ms': round(timings[int(len(timings) * 0.95) - 1], 2),
+        'queries': len(queries),
+    }
+
+
+def get_commit():
+    try:
+        return subprocess.check_output(
+            ('git', 'rev-parse', '--short', 'HEAD'), cwd=BASE_DIR, text=True,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--only', help='подстрока в имени эндпоинта')
+    args = parser.parse_args()
+
+    setup_test_environment()
+    # Замеряются эндпоинты, а не ограничение частоты запросов.
+    override_settings(REST_FRAMEWORK={
+        **settings.REST_FRAMEWORK, 'DEFAULT_THROTTLE_RATES': {},
+    }).enable()
+    user = User.objects.annotate(
+        follows=Count('follower', distinct=True),
+    ).order_by('-follows').first()
+    client = APIClient()
+    token, _ = Token.objects.get_or_create(user=user)
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+    results = {}
+    for name, url in get_endpoints().items():
+        if args.only and args.only not in name:
+            continue
+        results[name] = measure(client, url, args.repeat)
+
+    print(json.dumps({
+        'commit': get_commit(),
+        'dataset': {
+            'users': User.objects.count(),
+            'recipes': Recipe.objects.count(),
+        },
+        'repeat': args.repeat,
+        'endpoints': results,
+    }, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,141 @@
+"""
+Бенчмарк ленты подписок для пользователя с тысячами подписок.
+
+Сравнивает стратегии FEED_STRATEGY: inbox (записи ленты создаются
+при публикации) и merge (лента собирается запросом при чтении).
+Данные создаются командой seed_data в тестовой БД:
+    DB_ENGINE=django.db.backends.sqlite3 python benchmarks/feed.py \\
+        --authors 2000 --recipes 5 --repeat 20
+
+Отчёт в JSON: p50/p95 первой и глубокой страницы ленты, число
+SQL-запросов и время рассылки нового рецепта подписчикам.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from io import StringIO
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram_backend.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.core.management import call_command  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test.utils import (CaptureQueriesContext,  # noqa: E402
+                               override_settings, setup_databases,
+                               setup_test_environment, teardown_databases)
+from rest_framework.authtoken.models import Token  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+
+from api_foodgram.feed import fan_out_recipe, rebuild_feed  # noqa: E402
+from recipes.models import Recipe  # noqa: E402
+from users.models import Follow, User  # noqa: E402
+
+
+def percentiles(timings):
+    timings.sort()
+    return {
+        'p50_ms': round(statistics.median(timings), 2),
+        'p95_ms': round(timings[int(len(timings) * 0.95) - 1], 2),
+    }
+
+
+def measure_page(client, depth, repeat):
+    """Время открытия страницы ленты номер depth по курсору."""
+    url = '/api/recipes/feed/'
+    for _ in range(depth - 1):
+        url = client.get(url).json()['next']
+    timings = []
+    for _ in range(repeat):
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = client.get(url)
+            timings.append((time.perf_counter() - started) * 1000)
+        if response.status_code != 200:
+            raise RuntimeError(f'{url}: HTTP {response.status_code}')
+    return {**percentiles(timings), 'queries': len(queries)}
+
+
+def measure_fan_out(author, repeat):
+    timings = []
+    for _ in range(repeat):
+        recipe = Recipe.objects.filter(author=author).first()
+        recipe.feed_items.all().delete()
+        started = time.perf_counter()
+        fan_out_recipe(recipe)
+        timings.append((time.perf_counter() - started) * 1000)
+    return percentiles(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--authors', type=int, default=2000)
+    parser.add_argument('--recipes', type=int, default=5)
+    parser.add_argument('--depth', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    setup_test_environment()
+    old_config = setup_databases(verbosity=0, interactive=False)
+    try:
+        with tempfile.TemporaryDirectory() as media_root:
+            with override_settings(MEDIA_ROOT=media_root):
+                call_command(
+                    'seed_data', stdout=StringIO(), users=args.authors,
+                    recipes=args.recipes, favorites=0, cart=0, follows=0,
+                )
+                authors = list(User.objects.all())
+                reader = authors.pop()
+                # Читатель подписан на всех, все подписаны на автора.
+                Follow.objects.bulk_create(
+                    [Follow(follower=reader, author=author)
+                     for author in authors]
+                    + [Follow(follower=follower, author=authors[0])
+                       for follower in authors[1:]],
+                    batch_size=1000,
+                )
+                started = time.perf_counter()
+                rebuild_feed()
+                rebuild_seconds = time.perf_counter() - started
+
+                client = APIClient()
+                token, _ = Token.objects.get_or_create(user=reader)
+                client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+                results = {}
+                for strategy in ('inbox', 'merge'):
+                    with override_settings(FEED_STRATEGY=strategy):
+                        results[strategy] = {
+                            'first_page': measure_page(client, 1, args.repeat),
+                            f'page_{args.depth}': measure_page(
+                                client, args.depth, args.repeat,
+                            ),
+                        }
+                results['inbox']['fan_out'] = measure_fan_out(
+                    authors[0], args.repeat,
+                )
+    finally:
+        teardown_databases(old_config, verbosity=0)
+
+    print(json.dumps({
+        'dataset': {
+            'follows': len(authors),
+            'recipes': len(authors) * args.recipes,
+            'followers': len(authors) - 1,
+        },
+        'rebuild_seconds': round(rebuild_seconds, 2),
+        'repeat': args.repeat,
+        'strategies': results,
+    }, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+"""
+Бенчмарк FastJSONRenderer и FastJSONParser против JSONRenderer и JSONParser.
+
+Ответы - список рецептов, как его отдаёт /api/recipes/: страница
+и все рецепты одним списком. Данные создаются командой seed_data
+в тестовой БД:
+    DB_ENGINE=django.db.backends.sqlite3 \\
+        python benchmarks/json_renderer.py --recipes 100
+
+Отчёт в JSON: размер ответа, лучшее время рендеринга и разбора
+и совпадение результатов со стандартными классами DRF.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from io import BytesIO, StringIO
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram_backend.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.core.management import call_command  # noqa: E402
+from django.test.utils import (override_settings,  # noqa: E402
+                               setup_databases, setup_test_environment,
+                               teardown_databases)
+from rest_framework.parsers import JSONParser  # noqa: E402
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+from rest_framework.request import Request  # noqa: E402
+from rest_framework.settings import api_settings  # noqa: E402
+from rest_framework.test import APIRequestFactory  # noqa: E402
+
+from api_foodgram.cache import RECIPE_QUERYSET  # noqa: E402
+from api_foodgram.parsers import FastJSONParser  # noqa: E402
+from api_foodgram.renderers import FastJSONRenderer  # noqa: E402
+from api_foodgram.serializers import RecipeReadSerializer  # noqa: E402
+from users.models import User  # noqa: E402
+
+
+def best_ms(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+    return round(min(timings), 3)
+
+
+def get_payloads():
+    request = Request(APIRequestFactory().get('/api/recipes/'))
+    request.user = User.objects.first()
+    recipes = RecipeReadSerializer(
+        RECIPE_QUERYSET.all(), many=True, context={'request': request},
+    ).data
+    page = {
+        'count': len(recipes),
+        'next': 'http://testserver/api/recipes/?page=2',
+        'previous': None,
+        'results': recipes[:api_settings.PAGE_SIZE],
+    }
+    return {'page': page, 'all': recipes}
+
+
+def compare(payload, repeat):
+    result = {}
+    rendered = {}
+    for renderer in (JSONRenderer(), FastJSONRenderer()):
+        name = renderer.__class__.__name__
+        rendered[name] = renderer.render(payload)
+        result[f'{name}_ms'] = best_ms(
+            lambda: renderer.render(payload), repeat,
+        )
+    content = rendered['JSONRenderer']
+    result['bytes'] = len(content)
+    result['identical'] = content == rendered['FastJSONRenderer']
+    context = {'request': APIRequestFactory().post(
+        '/api/recipes/', content, content_type='application/json',
+    )}
+    parsed = {}
+    for parser in (JSONParser(), FastJSONParser()):
+        name = parser.__class__.__name__
+        parsed[name] = parser.parse(BytesIO(content), None, context)
+        result[f'{name}_ms'] = best_ms(
+            lambda: parser.parse(BytesIO(content), None, context), repeat,
+        )
+    result['parsed_identical'] = (
+        parsed['JSONParser'] == parsed['FastJSONParser']
+    )
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--recipes', type=int, default=5)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    setup_test_environment()
+    old_config = setup_databases(verbosity=0, interactive=False)
+    try:
+        with tempfile.TemporaryDirectory() as media_root:
+            with override_settings(MEDIA_ROOT=media_root):
+                call_command(
+                    'seed_data', stdout=StringIO(), users=args.users,
+                    recipes=args.recipes,
+                )
+                payloads = get_payloads()
+    finally:
+        teardown_databases(old_config, verbosity=0)
+
+    results = {
+        name: compare(payload, args.repeat)
+        for name, payload in payloads.items()
+    }
+    print(json.dumps({
+        'recipes': len(payloads['all']),
+        'repeat': args.repeat,
+        'results': results,
+    }, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
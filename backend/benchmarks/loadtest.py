@@ -0,0 +1,119 @@
+"""
+Нагрузочный тест API: пропускная способность и задержки
+при заданном числе одновременных клиентов.
+
+Все клиенты идут с одного адреса, поэтому ограничение частоты
+запросов на серверах отключается пустыми THROTTLE_RATE_*. Ответы 429
+всё равно считаются отдельно от ошибок и в задержки не попадают.
+
+Сравнение WSGI и ASGI:
+    export THROTTLE_RATE_SEARCH= THROTTLE_RATE_DOWNLOAD=
+    gunicorn --bind 0.0.0.0:8000 foodgram_backend.wsgi
+    ASYNC_VIEWS=True gunicorn --bind 0.0.0.0:8001 \\
+        -k uvicorn.workers.UvicornWorker foodgram_backend.asgi
+    python benchmarks/loadtest.py http://localhost:8000 http://localhost:8001
+"""
+import argparse
+import asyncio
+import json
+import time
+from urllib.parse import quote, urlsplit
+
+PATHS = (
+    '/api/recipes/',
+    '/api/recipes/?tags=breakfast',
+    '/api/tags/',
+    '/api/ingredients/?name=а',
+)
+
+
+def percentile(values, share):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+async def fetch(host, port, path, headers, slow_read):
+    reader, writer = await asyncio.open_connection(host, port)
+    request = (
+        f'GET {quote(path, safe="/?=&")} HTTP/1.1\r\nHost: {host}\r\n'
+        f'{headers}Connection: close\r\n\r\n'
+    )
+    writer.write(request.encode())
+    await writer.drain()
+    status = (await reader.readline()).split(b' ', 2)[1]
+    while True:
+        chunk = await reader.read(4096)
+        if not chunk:
+            break
+        if slow_read:
+            await asyncio.sleep(slow_read)
+    writer.close()
+    return int(status)
+
+
+async def client(target, paths, headers, deadline, slow_read, results):
+    url = urlsplit(target)
+    index = 0
+    while time.monotonic() < deadline:
+        path = paths[index % len(paths)]
+        index += 1
+        started = time.monotonic()
+        try:
+            status = await fetch(
+                url.hostname, url.port or 80, path, headers, slow_read
+            )
+        except (OSError, IndexError, ValueError):
+            status = None
+        results.append((status, time.monotonic() - started))
+
+
+async def run(target, args):
+    headers = ''
+    if args.token:
+        headers = f'Authorization: Token {args.token}\r\n'
+    results = []
+    started = time.monotonic()
+    deadline = started + args.duration
+    await asyncio.gather(*(
+        client(target, args.paths, headers, deadline, args.slow_read, results)
+        for _ in range(args.concurrency)
+    ))
+    elapsed = time.monotonic() - started
+    latencies = [latency for status, latency in results if status == 200]
+    throttled = sum(status == 429 for status, _ in results)
+    report = {
+        'target': target,
+        'concurrency': args.concurrency,
+        'requests': len(results),
+        'throttled': throttled,
+        'errors': len(results) - len(latencies) - throttled,
+    }
+    if latencies:
+        report.update({
+            'rps': round(len(latencies) / elapsed, 1),
+            'p50_ms': round(percentile(latencies, 0.50) * 1000, 1),
+            'p99_ms': round(percentile(latencies, 0.99) * 1000, 1),
+        })
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('targets', nargs='+', help='http://host:port')
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument(
+        '--slow-read', type=float, default=0,
+        help='пауза в секундах между чтениями ответа (медленный клиент)',
+    )
+    parser.add_argument('--token', help='токен авторизации')
+    parser.add_argument('--paths', nargs='+', default=PATHS)
+    args = parser.parse_args()
+    report = [asyncio.run(run(target, args)) for target in args.targets]
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,206 @@
+"""
+Согласованность списка покупок плана питания в кеше с БД.
+
+План меняется через API случайной последовательностью действий:
+добавление рецепта в день, изменение числа порций, удаление рецепта
+из плана, правка и удаление рецептов плана их автором, переименование
+ингредиента. После каждого действия список из get_plan_ingredients
+сравнивается с заново посчитанным aggregate_ingredients. Правки
+самого плана должны обновлять список в кеше, а не сбрасывать его.
+Кеш общий для процессов, как в docker-compose:
+    python benchmarks/meal_plan_cache.py --steps 60
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram_backend.settings')
+
+import django  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+DIRECTORY = tempfile.mkdtemp()
+settings.DATABASES = {'default': {
+    'ENGINE': 'django.db.backends.sqlite3',
+    'NAME': os.path.join(DIRECTORY, 'default.sqlite3'),
+}}
+settings.DATABASE_REPLICAS = []
+settings.CACHES = {'default': {
+    'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+    'LOCATION': os.path.join(DIRECTORY, 'cache'),
+}}
+settings.MEDIA_ROOT = os.path.join(DIRECTORY, 'media')
+
+django.setup()
+
+from django.core.cache import cache  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.db import connections  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+
+from api_foodgram.cache import ALL_RECIPES, get_version_key  # noqa: E402
+from api_foodgram.meal_plans import (aggregate_ingredients,  # noqa: E402
+                                     annotate_state, get_plan_ingredients,
+                                     get_plan_key, get_state)
+from recipes.models import MealPlan, MealPlanRecipe, Recipe  # noqa: E402
+from users.models import User  # noqa: E402
+
+DATES = [f'2026-03-{day:02d}' for day in range(1, 8)]
+
+
+class PlanActions:
+    """Случайные изменения плана и его рецептов через API."""
+
+    def __init__(self, plan_id, rng):
+        self.rng = rng
+        self.plan_id = plan_id
+        self.owner = get_client(MealPlan.objects.get(pk=plan_id).author)
+        self.url = f'/api/meal_plans/{plan_id}/days/'
+
+    def entries(self):
+        return list(MealPlanRecipe.objects.filter(
+            day__plan_id=self.plan_id,
+        ).select_related('day'))
+
+    def entry_url(self, entry):
+        return f'{self.url}{entry.day.date}/recipes/{entry.recipe_id}/'
+
+    def add(self):
+        recipe_id = self.rng.choice(
+            list(Recipe.objects.values_list('id', flat=True))
+        )
+        return self.owner.post(
+            f'{self.url}{self.rng.choice(DATES)}/recipes/{recipe_id}/',
+            {'servings': self.rng.randint(1, 5)}, format='json',
+        )
+
+    def servings(self, entry):
+        return self.owner.patch(
+            self.entry_url(entry), {'servings': self.rng.randint(1, 5)},
+            format='json',
+        )
+
+    def delete(self, entry):
+        return self.owner.delete(self.entry_url(entry))
+
+    def edit_recipe(self, entry):
+        recipe = entry.recipe
+        rows = list(recipe.am_ingredients.all())
+        kept = self.rng.sample(rows, self.rng.randint(1, len(rows)))
+        return get_client(recipe.author).patch(
+            f'/api/recipes/{recipe.id}/', {
+                'ingredients': [
+                    {
+                        'id': row.ingredients_id,
+                        'amount': self.rng.randint(1, 500),
+                    }
+                    for row in kept
+                ],
+                'tags': list(recipe.tags.values_list('id', flat=True)),
+            }, format='json',
+        )
+
+    def delete_recipe(self, entry):
+        return get_client(entry.recipe.author).delete(
+            f'/api/recipes/{entry.recipe_id}/'
+        )
+
+    def rename_ingredient(self, entry):
+        ingredient = entry.recipe.am_ingredients.first().ingredients
+        ingredient.name = f'{ingredient.name}*'
+        ingredient.save()
+
+
+def get_client(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+def get_plan(plan_id):
+    return annotate_state(MealPlan.objects.filter(pk=plan_id)).get()
+
+
+def is_cached(plan):
+    """Список в кеше посчитан для текущего состояния плана."""
+    cached = cache.get(get_plan_key(plan.id))
+    return cached is not None and cached[0] == get_state(
+        plan, cache.get(get_version_key(ALL_RECIPES), 0),
+    )
+
+
+def run(steps, rng):
+    plan_id = get_client(User.objects.first()).post(
+        '/api/meal_plans/', {'name': 'План'}, format='json',
+    ).data['id']
+    actions = PlanActions(plan_id, rng)
+    # Действия над самим планом обновляют список в кеше.
+    plan_actions = {'add', 'servings', 'delete'}
+    weights = {
+        'add': 5, 'servings': 3, 'delete': 2, 'edit_recipe': 2,
+        'delete_recipe': 1, 'rename_ingredient': 1,
+    }
+    errors = []
+    for step in range(steps):
+        entries = actions.entries()
+        name = rng.choices(list(weights), list(weights.values()))[0]
+        if name != 'add' and not entries:
+            name = 'add'
+        # Список должен быть в кеше до действия, чтобы проверить
+        # его обновление, а не расчёт заново.
+        get_plan_ingredients(get_plan(plan_id))
+        if name == 'add':
+            response = actions.add()
+        else:
+            response = getattr(actions, name)(rng.choice(entries))
+        if response is not None and response.status_code >= 400 and (
+            response.status_code != 400 or name != 'add'
+        ):
+            errors.append(f'{step} {name}: HTTP {response.status_code}')
+        plan = get_plan(plan_id)
+        if name in plan_actions and not is_cached(plan):
+            errors.append(f'{step} {name}: список сброшен из кеша')
+        expected = sorted(
+            (ingredient, unit, total)
+            for (ingredient, unit), total in aggregate_ingredients(
+                plan_id,
+            ).items()
+        )
+        if get_plan_ingredients(plan) != expected:
+            errors.append(f'{step} {name}: список расходится с БД')
+    return errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--steps', type=int, default=60)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    setup_test_environment()
+    try:
+        call_command('migrate', verbosity=0)
+        call_command(
+            'seed_data', stdout=StringIO(), users=10, recipes=3,
+            favorites=0, cart=0, follows=0,
+        )
+        errors = run(args.steps, random.Random(args.seed))
+    finally:
+        connections.close_all()
+        shutil.rmtree(DIRECTORY)
+    if errors:
+        print('\n'.join(errors), file=sys.stderr)
+        sys.exit(1)
+    print('список покупок плана согласован с БД')
+
+
+if __name__ == '__main__':
+    main()
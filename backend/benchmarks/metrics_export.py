@@ -0,0 +1,122 @@
+"""
+Проверка /metrics/ при нескольких воркерах.
+
+Воркеры - процессы, запущенные fork после настройки Django, как
+воркеры gunicorn с preload. Каждый выполняет свои запросы, а /metrics/
+любого процесса должен отдавать их сумму. Доступ к метрикам есть
+только у сотрудника и по METRICS_TOKEN:
+    python benchmarks/metrics_export.py
+"""
+import multiprocessing
+import os
+import re
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram_backend.settings')
+
+import django  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+DIRECTORY = tempfile.mkdtemp()
+settings.DATABASES = {'default': {
+    'ENGINE': 'django.db.backends.sqlite3',
+    'NAME': os.path.join(DIRECTORY, 'default.sqlite3'),
+}}
+settings.DATABASE_REPLICAS = []
+settings.METRICS_DIR = os.path.join(DIRECTORY, 'metrics')
+settings.METRICS_TOKEN = 'metrics-token'
+settings.INSTRUMENTATION_SAMPLE_RATE = 1
+
+django.setup()
+
+from django.core.management import call_command  # noqa: E402
+from django.db import connections  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+
+from api_foodgram.instrumentation import registry  # noqa: E402
+from users.models import User  # noqa: E402
+
+# Запросов к /api/tags/ в каждом воркере.
+WORKER_REQUESTS = (3, 4)
+TAGS = re.compile(r'^foodgram_requests_total\{view="TagViewSet.list"\} (\S+)$')
+
+
+def work(count):
+    for _ in range(count):
+        Client().get('/api/tags/')
+    registry.flush()
+
+
+def get_requests(content):
+    for line in content.splitlines():
+        match = TAGS.match(line)
+        if match:
+            return float(match.group(1))
+    return 0
+
+
+def run_checks(errors):
+    connections.close_all()
+    context = multiprocessing.get_context('fork')
+    workers = [
+        context.Process(target=work, args=(count,))
+        for count in WORKER_REQUESTS
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    work(1)
+
+    client = Client()
+    for name, headers in (
+        ('аноним', {}),
+        ('неверный токен', {'HTTP_AUTHORIZATION': 'Bearer wrong'}),
+    ):
+        response = client.get('/metrics/', **headers)
+        if response.status_code != 403:
+            errors.append(f'{name}: HTTP {response.status_code}')
+    response = client.get(
+        '/metrics/',
+        HTTP_AUTHORIZATION=f'Bearer {settings.METRICS_TOKEN}',
+    )
+    if response.status_code != 200:
+        errors.append(f'токен: HTTP {response.status_code}')
+    expected = sum(WORKER_REQUESTS) + 1
+    requests = get_requests(response.content.decode())
+    if requests != expected:
+        errors.append(f'запросов в метриках {requests:g} вместо {expected}')
+
+    client.force_login(User.objects.create_user(
+        username='staff', email='staff@example.com', password='password',
+        is_staff=True,
+    ))
+    response = client.get('/metrics/')
+    if response.status_code != 200:
+        errors.append(f'сотрудник: HTTP {response.status_code}')
+
+
+def main():
+    setup_test_environment()
+    errors = []
+    try:
+        os.makedirs(settings.METRICS_DIR)
+        call_command('migrate', verbosity=0)
+        run_checks(errors)
+    finally:
+        connections.close_all()
+        shutil.rmtree(DIRECTORY)
+    if errors:
+        print('\n'.join(errors), file=sys.stderr)
+        sys.exit(1)
+    print('метрики воркеров складываются')
+
+
+if __name__ == '__main__':
+    main()
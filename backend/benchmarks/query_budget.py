@@ -0,0 +1,302 @@
+"""
+Проверка бюджета SQL-запросов для маршрутов API.
+
+Каждый маршрут выполняется на двух объёмах данных в тестовой БД.
+Проверка не проходит, если число запросов превышает бюджет
+или растёт вместе с объёмом данных (запросы в цикле).
+
+Запуск на SQLite:
+    DB_ENGINE=django.db.backends.sqlite3 python benchmarks/query_budget.py
+"""
+import os
+import sys
+import tempfile
+from collections import Counter
+from io import StringIO
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram_backend.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.core.management import call_command  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.db.models import Count  # noqa: E402
+from django.db.models.signals import post_init  # noqa: E402
+from django.test.utils import (CaptureQueriesContext,  # noqa: E402
+                               override_settings, setup_databases,
+                               setup_test_environment, teardown_databases)
+from rest_framework.authtoken.models import Token  # noqa: E402
+from rest_framework.settings import api_settings  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+
+from recipes.management.commands.seed_data import IMAGE_NAME  # noqa: E402
+from recipes.models import Ingredient, Recipe, Tag  # noqa: E402
+from users.models import Follow, User  # noqa: E402
+
+IMAGE = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABAgMAAABieywaAAAAC'
+    'VBMVEUAAAD///9fX1/S0ecCAAAACXBIWXMAAA7EAAAOxAGVKw4bAAAACklEQVQImWNoAAAAg'
+    'gCByxOyYQAAAABJRU5ErkJggg=='
+)
+PASSWORD = 'Qwerty-12345'
+FILE_CACHE = 'django.core.cache.backends.filebased.FileBasedCache'
+
+# Рецептов у плодовитого автора, на которого подписан читатель.
+PROLIFIC_RECIPES = 200
+
+# Объёмы данных: параметры команды seed_data, добавляются к предыдущим.
+SIZES = (
+    {'users': 10, 'recipes': 3, 'favorites': 5, 'cart': 3, 'follows': 5},
+    {'users': 60, 'recipes': 6, 'favorites': 30, 'cart': 15, 'follows': 30},
+)
+
+
+class QueryBudget:
+    """Выполняет запросы и сверяет число SQL-запросов с бюджетом."""
+
+    def __init__(self):
+        self.counts = {}
+        self.errors = []
+
+    def check(self, name, budget, response_method, url, data=None,
+              status=200, rows=None):
+        """rows - бюджет загруженных объектов: {модель: число}."""
+        loaded = Counter()
+
+        def count_instance(sender, **kwargs):
+            loaded[sender] += 1
+
+        post_init.connect(count_instance)
+        try:
+            with CaptureQueriesContext(connection) as queries:
+                response = response_method(url, data, format='json')
+        finally:
+            post_init.disconnect(count_instance)
+        if response.status_code != status:
+            self.errors.append(
+                f'{name}: HTTP {response.status_code} вместо {status}'
+            )
+        count = len(queries)
+        if count > budget:
+            self.errors.append(
+                f'{name}: {count} SQL-запросов при бюджете {budget}'
+            )
+        for model, limit in (rows or {}).items():
+            if loaded[model] > limit:
+                self.errors.append(
+                    f'{name}: загружено {loaded[model]} '
+                    f'{model.__name__} при бюджете {limit}'
+                )
+        self.counts.setdefault(name, []).append(count)
+        return response
+
+    def check_growth(self):
+        for name, counts in self.counts.items():
+            if counts[-1] > counts[0]:
+                self.errors.append(
+                    f'{name}: число запросов растёт с объёмом данных {counts}'
+                )
+
+
+def get_client(user):
+    client = APIClient()
+    token, _ = Token.objects.get_or_create(user=user)
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    return client
+
+
+def run_checks(budget):
+    anonymous = APIClient()
+    reader = User.objects.annotate(
+        follows=Count('follower', distinct=True),
+    ).order_by('-follows').first()
+    client = get_client(reader)
+    check = budget.check
+
+    check('recipes-list', 9, client.get, '/api/recipes/')
+    check('recipes-list anonymous', 5, anonymous.get, '/api/recipes/')
+    check(
+        'recipes-list favorited', 8, client.get,
+        '/api/recipes/?is_favorited=1',
+    )
+    check(
+        'recipes-list tags', 10, client.get,
+        '/api/recipes/?tags=breakfast&tags=lunch',
+    )
+    check('tags-list', 1, client.get, '/api/tags/')
+    tag = Tag.objects.first()
+    check('tags-detail', 1, client.get, f'/api/tags/{tag.id}/')
+    check('ingredients-list', 1, client.get, '/api/ingredients/?name=а')
+    ingredients = list(Ingredient.objects.all()[:2])
+    check(
+        'ingredients-detail', 1, client.get,
+        f'/api/ingredients/{ingredients[0].id}/',
+    )
+    check('users-list', 2, client.get, '/api/users/')
+    check('users-list anonymous', 2, anonymous.get, '/api/users/')
+    check('users-me', 0, client.get, '/api/users/me/')
+    check('users-detail', 1, client.get, f'/api/users/{reader.id}/')
+    check(
+        'subscriptions', 3, client.get,
+        '/api/users/subscriptions/?recipes_limit=3',
+    )
+    # Рецептов читается не больше recipes_limit на автора страницы.
+    prolific = User.objects.create(
+        email=f'prolific{User.objects.count()}@example.org',
+        username=f'prolific{User.objects.count()}',
+    )
+    Recipe.objects.bulk_create(
+        Recipe(
+            author=prolific, name=f'Рецепт {number}', image=IMAGE_NAME,
+            text='Описание', cooking_time=10,
+        )
+        for number in range(PROLIFIC_RECIPES)
+    )
+    Follow.objects.create(follower=reader, author=prolific)
+    check(
+        'subscriptions prolific', 3, client.get,
+        '/api/users/subscriptions/?recipes_limit=3',
+        rows={Recipe: 3 * api_settings.PAGE_SIZE},
+    )
+    check('recipes-feed', 7, client.get, '/api/recipes/feed/')
+    check(
+        'download-shopping-cart', 1, client.get,
+        '/api/recipes/download_shopping_cart/',
+    )
+
+    response = check('users-create', 3, anonymous.post, '/api/users/', {
+        'email': f'budget{User.objects.count()}@example.org',
+        'username': f'budget{User.objects.count()}',
+        'first_name': 'Бюджет',
+        'last_name': 'Запросов',
+        'password': PASSWORD,
+    }, status=201)
+    author = User.objects.get(id=response.json()['id'])
+    author_client = get_client(author)
+
+    response = check(
+        'recipes-create', 21, author_client.post, '/api/recipes/', {
+            'ingredients': [
+                {'id': ingredient.id, 'amount': 10}
+                for ingredient in ingredients
+            ],
+            'tags': [tag.id],
+            'image': IMAGE,
+            'name': 'Рецепт',
+            'text': 'Описание',
+            'cooking_time': 10,
+        }, status=201,
+    )
+    response_recipe_id = response.json()['id']
+    recipe_url = f'/api/recipes/{response_recipe_id}/'
+    check('recipes-detail', 3, client.get, recipe_url)
+    check('recipes-similar', 1, client.get, recipe_url + 'similar/')
+    # Права на объект проверяются без запросов к БД.
+    check(
+        'recipes-partial-update forbidden', 0, client.patch, recipe_url,
+        {'name': 'Чужой рецепт'}, status=403,
+    )
+    check(
+        'recipes-destroy forbidden', 0, client.delete, recipe_url,
+        status=403,
+    )
+    check('recipes-partial-update', 17, author_client.patch, recipe_url, {
+        'ingredients': [{'id': ingredients[0].id, 'amount': 5}],
+        'tags': [tag.id],
+        'name': 'Новое название',
+    })
+    check(
+        'recipes-favorite', 3, client.post, recipe_url + 'favorite/',
+        status=201,
+    )
+    check(
+        'recipes-favorite delete', 2, client.delete,
+        recipe_url + 'favorite/', status=204,
+    )
+    check(
+        'recipes-shopping-cart', 3, client.post,
+        recipe_url + 'shopping_cart/', status=201,
+    )
+    check(
+        'recipes-shopping-cart delete', 2, client.delete,
+        recipe_url + 'shopping_cart/', status=204,
+    )
+    response = check(
+        'meal-plans-create', 2, client.post, '/api/meal_plans/',
+        {'name': 'План'}, status=201,
+    )
+    plan_url = f'/api/meal_plans/{response.json()["id"]}/'
+    check(
+        'meal-plans-recipe', 9, client.post,
+        f'{plan_url}days/2024-03-04/recipes/{response_recipe_id}/',
+        {'servings': 2}, status=201,
+    )
+    check('meal-plans-detail', 3, client.get, plan_url)
+    check(
+        'meal-plans-shopping-list', 2, client.get,
+        plan_url + 'shopping_list/',
+    )
+    # Список берётся из кеша плана.
+    check(
+        'meal-plans-shopping-list cached', 1, client.get,
+        plan_url + 'shopping_list/',
+    )
+    check(
+        'meal-plans-download', 1, client.get,
+        plan_url + 'download_shopping_list/',
+    )
+    check(
+        'subscribe', 8, client.post,
+        f'/api/users/{author.id}/subscribe/?recipes_limit=3', status=201,
+    )
+    check(
+        'subscribe delete', 6, client.delete,
+        f'/api/users/{author.id}/subscribe/', status=204,
+    )
+    check(
+        'recipes-destroy', 10, author_client.delete, recipe_url, status=204,
+    )
+    check('token-login', 3, anonymous.post, '/api/auth/token/login/', {
+        'email': author.email, 'password': PASSWORD,
+    })
+    check(
+        'token-logout', 3, author_client.post, '/api/auth/token/logout/',
+        status=204,
+    )
+
+
+def main():
+    setup_test_environment()
+    old_config = setup_databases(verbosity=0, interactive=False)
+    budget = QueryBudget()
+    try:
+        with tempfile.TemporaryDirectory() as media_root:
+            # Бюджеты считаются с общим кешем, как в docker-compose.
+            with override_settings(MEDIA_ROOT=media_root, CACHES={
+                'default': {
+                    'BACKEND': FILE_CACHE,
+                    'LOCATION': os.path.join(media_root, 'cache'),
+                },
+            }):
+                for size in SIZES:
+                    call_command('seed_data', stdout=StringIO(), **size)
+                    call_command('rebuild_feed', stdout=StringIO())
+                    run_checks(budget)
+    finally:
+        teardown_databases(old_config, verbosity=0)
+    budget.check_growth()
+
+    for name, counts in budget.counts.items():
+        print(f'{name:32} {counts}')
+    if budget.errors:
+        print('\n'.join(budget.errors), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
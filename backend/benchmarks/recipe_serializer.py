@@ -0,0 +1,186 @@
+"""
+Сверка и бенчмарк RecipeReadSerializer.
+
+Ответ сравнивается с эталонным ModelSerializer, из которого собран
+RecipeReadSerializer, для читателя с подписками, избранным и списком
+покупок, для анонима и без запроса в контексте. При расхождении
+скрипт завершается с ошибкой. Данные создаются командой seed_data
+в тестовой БД:
+    DB_ENGINE=django.db.backends.sqlite3 \\
+        python benchmarks/recipe_serializer.py --recipes 100
+
+Отчёт в JSON: время сериализации страницы и всех рецептов
+и число SQL-запросов при сериализации.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from io import StringIO
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram_backend.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth.models import AnonymousUser  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.db.models import Count  # noqa: E402
+from django.test.utils import (CaptureQueriesContext,  # noqa: E402
+                               override_settings, setup_databases,
+                               setup_test_environment, teardown_databases)
+from rest_framework import serializers  # noqa: E402
+from rest_framework.request import Request  # noqa: E402
+from rest_framework.settings import api_settings  # noqa: E402
+from rest_framework.test import APIRequestFactory  # noqa: E402
+
+from api_foodgram.cache import RECIPE_QUERYSET  # noqa: E402
+from api_foodgram.serializers import (CustomUserSerializer,  # noqa: E402
+                                      RecipeReadSerializer, TagSerializer)
+from recipes.models import (Cart, Favorite,  # noqa: E402
+                            IngredientAmount, Recipe)
+from users.models import User  # noqa: E402
+
+
+class IngredientAmountSerializer(serializers.ModelSerializer):
+    id = serializers.ReadOnlyField(source='ingredients.id')
+    name = serializers.ReadOnlyField(source='ingredients.name')
+    measurement_unit = serializers.ReadOnlyField(
+        source='ingredients.measurement_unit',
+    )
+
+    class Meta:
+        model = IngredientAmount
+        fields = ('id', 'name', 'measurement_unit', 'amount',)
+
+
+class RecipeListSerializer(serializers.ModelSerializer):
+    """Эталон: прежний сериализатор просмотра рецептов."""
+    tags = TagSerializer(many=True)
+    author = CustomUserSerializer()
+    ingredients = IngredientAmountSerializer(
+        source='am_ingredients', many=True,
+    )
+    is_favorited = serializers.SerializerMethodField()
+    is_in_shopping_cart = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Recipe
+        fields = (
+            'id', 'tags', 'author', 'ingredients', 'name', 'is_favorited',
+            'is_in_shopping_cart', 'image', 'text', 'cooking_time',
+        )
+        read_only_fields = ('__all__',)
+
+    def get_is_favorited(self, obj):
+        request = self.context.get('request')
+        if request and request.user.is_authenticated:
+            return Favorite.objects.filter(
+                recipe=obj, author=request.user
+            ).exists()
+        return False
+
+    def get_is_in_shopping_cart(self, obj):
+        request = self.context.get('request')
+        if request and request.user.is_authenticated:
+            return Cart.objects.filter(
+                recipe=obj, author=request.user
+            ).exists()
+        return False
+
+
+def get_contexts():
+    reader = User.objects.annotate(
+        follows=Count('follower', distinct=True),
+    ).order_by('-follows').first()
+    contexts = {'no request': {}}
+    for name, user in (('reader', reader), ('anonymous', AnonymousUser())):
+        request = Request(APIRequestFactory().get('/api/recipes/'))
+        request.user = user
+        contexts[name] = {'request': request}
+    return contexts
+
+
+def compare(recipes, contexts):
+    """Имена контекстов, в которых ответы сериализаторов расходятся."""
+    mismatches = []
+    for name, context in contexts.items():
+        expected = RecipeListSerializer(recipes, many=True, context=context)
+        actual = RecipeReadSerializer(recipes, many=True, context=context)
+        if json.dumps(expected.data) != json.dumps(actual.data):
+            mismatches.append(f'{name}: список')
+        for recipe in recipes:
+            expected = RecipeListSerializer(recipe, context=context)
+            actual = RecipeReadSerializer(recipe, context=context)
+            if json.dumps(expected.data) != json.dumps(actual.data):
+                mismatches.append(f'{name}: рецепт {recipe.id}')
+                break
+    return mismatches
+
+
+def measure(serializer_class, recipes, context, repeat):
+    with CaptureQueriesContext(connection) as queries:
+        serializer_class(recipes, many=True, context=context).data
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        serializer_class(recipes, many=True, context=context).data
+        timings.append((time.perf_counter() - started) * 1000)
+    return {'min_ms': round(min(timings), 2), 'queries': len(queries)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--recipes', type=int, default=5)
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    setup_test_environment()
+    old_config = setup_databases(verbosity=0, interactive=False)
+    try:
+        with tempfile.TemporaryDirectory() as media_root:
+            with override_settings(MEDIA_ROOT=media_root):
+                call_command(
+                    'seed_data', stdout=StringIO(), users=args.users,
+                    recipes=args.recipes,
+                )
+                contexts = get_contexts()
+                recipes = list(RECIPE_QUERYSET.all())
+                mismatches = compare(recipes, contexts)
+                context = contexts['reader']
+                results = {}
+                for name, page in (
+                    ('page', recipes[:api_settings.PAGE_SIZE]),
+                    ('all', recipes),
+                ):
+                    results[name] = {
+                        serializer_class.__name__: measure(
+                            serializer_class, page, context, args.repeat,
+                        )
+                        for serializer_class in (
+                            RecipeListSerializer, RecipeReadSerializer,
+                        )
+                    }
+    finally:
+        teardown_databases(old_config, verbosity=0)
+
+    print(json.dumps({
+        'recipes': len(recipes),
+        'repeat': args.repeat,
+        'mismatches': mismatches,
+        'results': results,
+    }, ensure_ascii=False, indent=2))
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+"""
+Проверка маршрутизации запросов между основной БД и репликой.
+
+Основная БД и реплика - два файла SQLite, реплика - копия основной
+на момент заполнения. Запросы к каждой БД считаются отдельно,
+а для асинхронных запросов БД видна по данным, которых нет на реплике:
+    python benchmarks/replica_routing.py
+"""
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram_backend.settings')
+
+import django  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+DIRECTORY = tempfile.mkdtemp()
+settings.DATABASES = {
+    alias: {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(DIRECTORY, f'{alias}.sqlite3'),
+    }
+    for alias in ('default', 'replica_0')
+}
+settings.DATABASE_REPLICAS = ['replica_0']
+# Реплики требуют общего для процессов кеша.
+settings.CACHES = {'default': {
+    'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+    'LOCATION': os.path.join(DIRECTORY, 'cache'),
+}}
+settings.MEDIA_ROOT = os.path.join(DIRECTORY, 'media')
+
+django.setup()
+
+from django.core.management import call_command  # noqa: E402
+from django.db import connections, transaction  # noqa: E402
+from django.test import AsyncClient  # noqa: E402
+from django.test.utils import (CaptureQueriesContext,  # noqa: E402
+                               setup_test_environment)
+from rest_framework.authtoken.models import Token  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+
+from api_foodgram.db import use_replica  # noqa: E402
+from recipes.models import Recipe, Tag  # noqa: E402
+from users.models import User  # noqa: E402
+
+
+class Routing:
+    """Выполняет запросы и проверяет, в какие БД они попали."""
+
+    def __init__(self):
+        self.errors = []
+
+    def check(self, name, expected, call, *args, **kwargs):
+        """expected - алиас БД, в которую должны попасть все запросы."""
+        with CaptureQueriesContext(connections['default']) as primary:
+            with CaptureQueriesContext(connections['replica_0']) as replica:
+                result = call(*args, **kwargs)
+        counts = {'default': len(primary), 'replica_0': len(replica)}
+        other = 'replica_0' if expected == 'default' else 'default'
+        if not counts[expected] or counts[other]:
+            self.errors.append(f'{name}: запросы по БД {counts}')
+        return result
+
+
+def get_client(token):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    return client
+
+
+def select_for_update(recipe_id):
+    token = use_replica.set(True)
+    try:
+        with transaction.atomic():
+            return list(
+                Recipe.objects.select_for_update().filter(pk=recipe_id)
+            )
+    finally:
+        use_replica.reset(token)
+
+
+async def get_async(path):
+    return await AsyncClient().get(path)
+
+
+def run_checks(routing):
+    reader, writer = (
+        get_client(Token.objects.get(user=user))
+        for user in User.objects.order_by('id')[:2]
+    )
+    recipe = Recipe.objects.first()
+    check = routing.check
+
+    check('safe read', 'replica_0', APIClient().get, '/api/tags/')
+    check('select_for_update', 'default', select_for_update, recipe.id)
+    response = check(
+        'write', 'default', writer.post,
+        f'/api/recipes/{recipe.id}/favorite/',
+    )
+    if response.status_code != 201:
+        routing.errors.append(f'write: HTTP {response.status_code}')
+    # Избранного нет на реплике, закреплённый клиент видит его сразу.
+    response = check(
+        'pinned read', 'default', writer.get,
+        '/api/recipes/?is_favorited=1',
+    )
+    if response.json()['count'] != 1:
+        routing.errors.append('pinned read: нет нового избранного')
+    response = check(
+        'failed write', 'default', reader.post, '/api/recipes/0/favorite/',
+    )
+    if response.status_code != 404:
+        routing.errors.append(f'failed write: HTTP {response.status_code}')
+    # После неудачной записи клиент не закрепляется за основной БД.
+    check('read after failed write', 'replica_0', reader.get, '/api/tags/')
+
+    # Под ASGI запросы идут в других потоках, БД видна по данным.
+    Tag.objects.create(name='Нет на реплике', color='#000000', slug='new')
+    response = asyncio.run(get_async('/api/tags/'))
+    if any(tag['slug'] == 'new' for tag in response.json()):
+        routing.errors.append('async safe read: чтение из основной БД')
+
+
+def main():
+    setup_test_environment()
+    routing = Routing()
+    try:
+        call_command('migrate', verbosity=0)
+        call_command(
+            'seed_data', stdout=StringIO(), users=3, recipes=2,
+            favorites=0, cart=0, follows=0,
+        )
+        for user in User.objects.all():
+            Token.objects.create(user=user)
+        connections.close_all()
+        shutil.copy(
+            settings.DATABASES['default']['NAME'],
+            settings.DATABASES['replica_0']['NAME'],
+        )
+        run_checks(routing)
+    finally:
+        connections.close_all()
+        shutil.rmtree(DIRECTORY)
+    if routing.errors:
+        print('\n'.join(routing.errors), file=sys.stderr)
+        sys.exit(1)
+    print('маршрутизация по БД верна')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""
+Сверка пошагового пересчёта похожих рецептов с полным.
+
+После правок ингредиентов и тегов рецептов списки, обновлённые
+update_similar_recipes, сравниваются со списками, которые строит
+build_similar_recipes с нуля. При расхождении скрипт завершается
+с ошибкой. Данные создаются командой seed_data в тестовой БД:
+    DB_ENGINE=django.db.backends.sqlite3 \\
+        python benchmarks/similar_recipes.py --edits 20
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram_backend.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.db import transaction  # noqa: E402
+from django.test.utils import (override_settings,  # noqa: E402
+                               setup_databases, setup_test_environment,
+                               teardown_databases)
+
+from recipes.models import (Ingredient, IngredientAmount,  # noqa: E402
+                            Recipe, SimilarRecipe, Tag)
+from recipes.similarity import (build_similar_recipes,  # noqa: E402
+                                update_similar_recipes)
+
+
+def get_lists(rows):
+    """Списки похожих по рецептам, сходство округлено."""
+    lists = {}
+    for recipe_id, similar_id, score in sorted(
+        rows, key=lambda row: (row[0], -row[2], row[1]),
+    ):
+        lists.setdefault(recipe_id, []).append((similar_id, round(score, 9)))
+    return lists
+
+
+def edit(recipe, rng, ingredient_ids, tag_ids):
+    """Меняет ингредиенты и теги рецепта, как это делает PATCH."""
+    other = rng.choice(ingredient_ids)
+    if rng.random() < 0.2:
+        # Рецепт без общих ингредиентов выпадает из всех списков.
+        ingredients = [Ingredient.objects.create(
+            name=f'Редкий {recipe.id}-{rng.random()}', measurement_unit='г',
+        ).id]
+    else:
+        current = list(recipe.am_ingredients.values_list(
+            'ingredients_id', flat=True,
+        ))
+        ingredients = set(rng.sample(current, rng.randint(1, len(current))))
+        ingredients.update(rng.sample(ingredient_ids, 3) + [other])
+    with transaction.atomic():
+        recipe.am_ingredients.all().delete()
+        IngredientAmount.objects.bulk_create(
+            IngredientAmount(recipe=recipe, ingredients_id=id, amount=1)
+            for id in ingredients
+        )
+        recipe.tags.set(rng.sample(tag_ids, rng.randint(0, len(tag_ids))))
+    update_similar_recipes(recipe.id)
+
+
+def run(edits, seed):
+    rng = random.Random(seed)
+    top = settings.SIMILAR_RECIPES_COUNT
+    call_command('build_similar_recipes', stdout=StringIO())
+    # Правки затрагивают ингредиенты, которые уже есть в рецептах.
+    ingredient_ids = sorted(set(IngredientAmount.objects.values_list(
+        'ingredients_id', flat=True,
+    )))
+    tag_ids = list(Tag.objects.values_list('id', flat=True))
+    recipes = list(Recipe.objects.order_by('id'))
+    for recipe in rng.choices(recipes, k=edits):
+        edit(recipe, rng, ingredient_ids, tag_ids)
+
+    actual = get_lists(
+        SimilarRecipe.objects.values_list('recipe_id', 'similar_id', 'score')
+    )
+    expected = get_lists(
+        row for batch in build_similar_recipes(top, 1000) for row in batch
+    )
+    return [
+        f'рецепт {recipe_id}: {actual.get(recipe_id)} '
+        f'вместо {expected.get(recipe_id)}'
+        for recipe_id in sorted(set(actual) | set(expected))
+        if actual.get(recipe_id) != expected.get(recipe_id)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--recipes', type=int, default=5)
+    parser.add_argument('--edits', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    setup_test_environment()
+    old_config = setup_databases(verbosity=0, interactive=False)
+    try:
+        with tempfile.TemporaryDirectory() as media_root:
+            with override_settings(MEDIA_ROOT=media_root):
+                call_command(
+                    'seed_data', stdout=StringIO(), users=args.users,
+                    recipes=args.recipes, favorites=0, cart=0, follows=0,
+                )
+                mismatches = run(args.edits, args.seed)
+    finally:
+        teardown_databases(old_config, verbosity=0)
+
+    if mismatches:
+        print('\n'.join(mismatches), file=sys.stderr)
+        sys.exit(1)
+    print('похожие рецепты совпадают с полным пересчётом')
+
+
+if __name__ == '__main__':
+    main()
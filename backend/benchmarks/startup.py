@@ -0,0 +1,112 @@
+"""
+Бенчмарк запуска gunicorn с профилем gunicorn.conf.py.
+
+Для каждого профиля запускает сервер на текущей БД и замеряет
+время до первого успешного ответа и задержку первых запросов,
+которые попадают в ещё не прогретые воркеры:
+    python benchmarks/startup.py --repeat 3
+
+Профили: cold - без preload и прогрева, preload - с загрузкой
+приложения в мастере, warm - preload и прогрев воркеров.
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from urllib.error import URLError
+from urllib.request import urlopen
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+PROFILES = {
+    'cold': {'GUNICORN_PRELOAD': 'False', 'GUNICORN_WARMUP': 'False'},
+    'preload': {'GUNICORN_PRELOAD': 'True', 'GUNICORN_WARMUP': 'False'},
+    'warm': {'GUNICORN_PRELOAD': 'True', 'GUNICORN_WARMUP': 'True'},
+}
+PATHS = ('/api/tags/', '/api/ingredients/?name=%D0%B0')
+
+
+def get_free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def get(url):
+    started = time.perf_counter()
+    with urlopen(url, timeout=30) as response:
+        response.read()
+    return (time.perf_counter() - started) * 1000
+
+
+def run(profile, workers):
+    port = get_free_port()
+    base_url = f'http://127.0.0.1:{port}'
+    env = {
+        **os.environ, **PROFILES[profile],
+        'GUNICORN_BIND': f'127.0.0.1:{port}',
+        'GUNICORN_WORKERS': str(workers),
+        'ALLOWED_HOSTS': os.getenv('ALLOWED_HOSTS', '') + ' 127.0.0.1',
+    }
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        ('gunicorn', '--config', 'gunicorn.conf.py'), cwd=BASE_DIR, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while True:
+            if server.poll() is not None:
+                raise RuntimeError(f'{profile}: gunicorn завершился')
+            try:
+                first = get(base_url + PATHS[0])
+                break
+            except (URLError, ConnectionError):
+                time.sleep(0.01)
+        ready = time.perf_counter() - started
+        # Запросы расходятся по воркерам, часть попадает в холодные.
+        timings = [first] + [
+            get(base_url + path)
+            for _ in range(workers * 2) for path in PATHS
+        ]
+    finally:
+        server.terminate()
+        server.wait()
+    return ready, timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--workers', type=int, default=3)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    results = {}
+    for profile in PROFILES:
+        ready = []
+        first = []
+        timings = []
+        for _ in range(args.repeat):
+            seconds, requests = run(profile, args.workers)
+            ready.append(seconds)
+            first.append(requests[0])
+            timings.extend(requests[1:])
+        results[profile] = {
+            'ready_s': round(statistics.median(ready), 3),
+            'first_request_ms': round(statistics.median(first), 2),
+            'max_request_ms': round(max(timings), 2),
+            'p50_request_ms': round(statistics.median(timings), 2),
+        }
+    print(json.dumps({
+        'workers': args.workers,
+        'repeat': args.repeat,
+        'profiles': results,
+    }, ensure_ascii=False, indent=2))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
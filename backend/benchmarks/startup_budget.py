@@ -0,0 +1,76 @@
+"""
+Проверка бюджета времени запуска приложения.
+
+Загрузка приложения (django.setup, WSGI-приложение и маршруты)
+выполняется в отдельных процессах. Проверка не проходит, если медиана
+превышает бюджет или при запуске импортируются тяжёлые пакеты,
+которые нужны только отдельным запросам и командам:
+    DB_ENGINE=django.db.backends.sqlite3 python benchmarks/startup_budget.py
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram_backend.settings')
+
+from recipes.management.commands.importtime import (  # noqa: E402
+    get_import_times, run_boot)
+
+BUDGET_MS = 1000
+# Пакет и где он нужен.
+LAZY_PACKAGES = {
+    'reportlab': 'download_shopping_cart',
+    'numpy': 'build_similar_recipes',
+    'scipy': 'build_similar_recipes',
+}
+
+
+def measure(function, *args):
+    started = time.perf_counter()
+    function(*args)
+    return (time.perf_counter() - started) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--budget-ms', type=int, default=BUDGET_MS)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    errors = []
+    times = get_import_times()
+    imported = {name.split('.')[0] for name in times}
+    for package, used_by in LAZY_PACKAGES.items():
+        if package in imported:
+            errors.append(
+                f'{package} импортируется при запуске, нужен только '
+                f'для {used_by}'
+            )
+
+    interpreter = statistics.median(
+        measure(subprocess.run, (sys.executable, '-c', 'pass'))
+        for _ in range(args.repeat)
+    )
+    boot = statistics.median(measure(run_boot) for _ in range(args.repeat))
+    print(f'{"interpreter":32} {interpreter:8.1f} мс')
+    print(f'{"boot":32} {boot:8.1f} мс')
+    print(f'{"modules":32} {len(times):8}')
+    if boot - interpreter > args.budget_ms:
+        errors.append(
+            f'Загрузка приложения: {boot - interpreter:.0f} мс '
+            f'при бюджете {args.budget_ms} мс'
+        )
+
+    if errors:
+        print('\n'.join(errors), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
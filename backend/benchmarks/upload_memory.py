@@ -0,0 +1,178 @@
+"""
+Пиковая память воркера при создании рецепта с большим изображением.
+
+Каждый способ загрузки выполняется в отдельном процессе: тело запроса
+читается из файла, как из сокета под gunicorn, а рост ru_maxrss
+за запрос показывает, сколько памяти понадобилось на его обработку:
+    DB_ENGINE=django.db.backends.sqlite3 python benchmarks/upload_memory.py
+"""
+import argparse
+import base64
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram_backend.settings')
+
+BOUNDARY = 'BenchmarkBoundary'
+MODES = ('json', 'multipart')
+SMALL_IMAGE = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABAgMAAABieywaAAAAC'
+    'VBMVEUAAAD///9fX1/S0ecCAAAACXBIWXMAAA7EAAAOxAGVKw4bAAAACklEQVQImWNoAAAAg'
+    'gCByxOyYQAAAABJRU5ErkJggg=='
+)
+
+
+def make_image(size_mb):
+    """PNG из шума: почти не сжимается, размер близок к заданному."""
+    from PIL import Image
+
+    side = int((size_mb * 1024 * 1024 / 3) ** 0.5)
+    image = Image.frombytes('RGB', (side, side), os.urandom(side * side * 3))
+    descriptor, path = tempfile.mkstemp(suffix='.png')
+    with os.fdopen(descriptor, 'wb') as file:
+        image.save(file, format='PNG', compress_level=1)
+    return path
+
+
+def get_fields(image=None):
+    fields = {
+        'tags': [1], 'ingredients': [{'id': 1, 'amount': 10}],
+        'name': 'Рецепт', 'text': 'Описание', 'cooking_time': 10,
+    }
+    if image is not None:
+        fields['image'] = image
+    return fields
+
+
+def write_body(mode, image_path, body):
+    with open(image_path, 'rb') as file:
+        content = file.read()
+    if mode == 'json':
+        body.write(json.dumps(get_fields(
+            'data:image/png;base64,' + base64.b64encode(content).decode()
+        )).encode())
+        return 'application/json'
+    body.write(
+        f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="data"'
+        f'\r\n\r\n{json.dumps(get_fields())}\r\n'
+        f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="image"; '
+        f'filename="image.png"\r\nContent-Type: image/png\r\n\r\n'.encode()
+    )
+    body.write(content)
+    body.write(f'\r\n--{BOUNDARY}--\r\n'.encode())
+    return f'multipart/form-data; boundary={BOUNDARY}'
+
+
+def get_max_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def call(application, token, body, content_type, length):
+    environ = {
+        'REQUEST_METHOD': 'POST', 'PATH_INFO': '/api/recipes/',
+        'SCRIPT_NAME': '', 'QUERY_STRING': '', 'SERVER_NAME': 'testserver',
+        'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+        'wsgi.url_scheme': 'http', 'wsgi.input': body,
+        'wsgi.errors': sys.stderr, 'CONTENT_TYPE': content_type,
+        'CONTENT_LENGTH': str(length), 'HTTP_AUTHORIZATION': f'Token {token}',
+    }
+    statuses = []
+    response = application(
+        environ, lambda status, headers: statuses.append(status),
+    )
+    b''.join(response)
+    response.close()
+    return statuses[0]
+
+
+def run_mode(body_path, content_type):
+    """Выполняется в дочернем процессе, печатает результат в JSON."""
+    from io import BytesIO
+
+    import django
+
+    django.setup()
+
+    from django.core.wsgi import get_wsgi_application
+    from django.test.utils import (override_settings, setup_databases,
+                                   setup_test_environment)
+    from rest_framework.authtoken.models import Token
+
+    from recipes.models import Ingredient, Tag
+    from users.models import User
+
+    setup_test_environment()
+    setup_databases(verbosity=0, interactive=False)
+    with tempfile.TemporaryDirectory() as media_root:
+        with override_settings(MEDIA_ROOT=media_root):
+            user = User.objects.create_user(
+                email='bench@example.com', username='bench',
+                first_name='Bench', last_name='Bench', password='Bench-12345',
+            )
+            token = Token.objects.create(user=user).key
+            Tag.objects.create(name='Тег', color='#FF0000', slug='tag')
+            Ingredient.objects.create(name='Соль', measurement_unit='г')
+            application = get_wsgi_application()
+            # Первый запрос загружает модули, которые нужны обработке.
+            warm_up = json.dumps(get_fields(SMALL_IMAGE)).encode()
+            call(
+                application, token, BytesIO(warm_up), 'application/json',
+                len(warm_up),
+            )
+            before = get_max_rss_mb()
+            started = time.perf_counter()
+            with open(body_path, 'rb') as body:
+                status = call(
+                    application, token, body, content_type,
+                    os.path.getsize(body_path),
+                )
+            duration = time.perf_counter() - started
+    print(json.dumps({
+        'status': status,
+        'rss_mb': round(get_max_rss_mb() - before, 1),
+        'ms': round(duration * 1000),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--size-mb', type=float, default=8)
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=MODES)
+    parser.add_argument('--run', nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.run:
+        return run_mode(*args.run)
+
+    image_path = make_image(args.size_mb)
+    print(f'изображение {os.path.getsize(image_path) / 1024 / 1024:.1f} МБ')
+    try:
+        for mode in args.modes:
+            with tempfile.NamedTemporaryFile() as body:
+                content_type = write_body(mode, image_path, body)
+                body.flush()
+                output = subprocess.run(
+                    (sys.executable, __file__, '--run', body.name,
+                     content_type),
+                    check=True, stdout=subprocess.PIPE, text=True,
+                ).stdout
+                result = json.loads(output.splitlines()[-1])
+                size = os.path.getsize(body.name) / 1024 / 1024
+                print(
+                    f'{mode:10} тело {size:6.1f} МБ  '
+                    f'пик RSS +{result["rss_mb"]:6.1f} МБ  '
+                    f'{result["ms"]:5} мс  {result["status"]}'
+                )
+    finally:
+        os.remove(image_path)
+
+
+if __name__ == '__main__':
+    main()
@@ -30,6 +30,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'api_foodgram.instrumentation.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -37,8 +38,21 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api_foodgram.middleware.ReplicaRoutingMiddleware',
 ]
 
+# Доля запросов, для которых собираются метрики (0 - отключено).
+INSTRUMENTATION_SAMPLE_RATE = float(
+    os.getenv('INSTRUMENTATION_SAMPLE_RATE', 1)
+)
+# Запросы дольше этого порога пишутся в лог вместе с SQL.
+SLOW_REQUEST_MS = int(os.getenv('SLOW_REQUEST_MS', 500))
+# Каталог, через который воркеры gunicorn отдают общие метрики
+# в /metrics/; пусто - только метрики ответившего процесса.
+METRICS_DIR = os.getenv('METRICS_DIR', '')
+# Токен для /metrics/ без входа сотрудником; пусто - только сотрудники.
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
 ROOT_URLCONF = 'foodgram_backend.urls'
 
 TEMPLATES = [
@@ -59,21 +73,105 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'foodgram_backend.wsgi.application'
 
+ASGI_APPLICATION = 'foodgram_backend.asgi.application'
+
+# Асинхронное чтение рецептов, тегов, ингредиентов и подписок под ASGI.
+ASYNC_VIEWS = os.getenv('ASYNC_VIEWS', default='False') == 'True'
+
 
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
 
+# DB_ENGINE=django.db.backends.sqlite3 - для локальных проверок.
+DB_ENGINE = os.getenv('DB_ENGINE', 'django.db.backends.postgresql')
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': DB_ENGINE,
         'NAME': os.getenv('POSTGRES_DB', 'django'),
         'USER': os.getenv('POSTGRES_USER', 'django'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', 'django'),
         'HOST': os.getenv('DB_HOST', ''),
-        'PORT': os.getenv('DB_PORT', 5432)
+        'PORT': os.getenv('DB_PORT', 5432),
+        # Постоянные соединения: 0 - новое соединение на каждый запрос.
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', 60)),
+        # Проверка постоянного соединения перед обработкой запроса.
+        'CONN_HEALTH_CHECKS': os.getenv(
+            'DB_CONN_HEALTH_CHECKS', default='True'
+        ) == 'True',
+        # PgBouncer в режиме transaction не поддерживает серверные курсоры.
+        'DISABLE_SERVER_SIDE_CURSORS': os.getenv(
+            'DB_POOLER', default='False'
+        ) == 'True',
+        'OPTIONS': {
+            'connect_timeout': int(os.getenv('DB_CONNECT_TIMEOUT', 5)),
+        } if DB_ENGINE.endswith('postgresql') else {},
     }
 }
 
+# Реплики только для чтения: хосты через пробел.
+DATABASE_REPLICAS = []
+for index, host in enumerate(os.getenv('DB_REPLICA_HOSTS', '').split()):
+    alias = f'replica_{index}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['api_foodgram.db.ReplicaRouter']
+
+# Сколько секунд после записи читать данные пользователя из основной БД.
+REPLICA_PIN_SECONDS = int(os.getenv('DB_REPLICA_PIN_SECONDS', 5))
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
+    }
+}
+
+# Время жизни рецепта в кеше объектов, секунды.
+RECIPE_CACHE_TIMEOUT = int(os.getenv('RECIPE_CACHE_TIMEOUT', 300))
+
+# Время жизни ответа /users/me/ в кеше, секунды.
+PROFILE_CACHE_TIMEOUT = int(os.getenv('PROFILE_CACHE_TIMEOUT', 300))
+
+# Время жизни пользователя по токену в кеше аутентификации, секунды.
+AUTH_TOKEN_CACHE_TIMEOUT = int(os.getenv('AUTH_TOKEN_CACHE_TIMEOUT', 60))
+
+# Число похожих рецептов, которые хранятся для каждого рецепта.
+SIMILAR_RECIPES_COUNT = int(os.getenv('SIMILAR_RECIPES_COUNT', 10))
+
+# Лента подписок: inbox - записи ленты создаются при публикации рецепта,
+# merge - лента собирается запросом к рецептам при чтении.
+FEED_STRATEGY = os.getenv('FEED_STRATEGY', 'inbox')
+# Сколько последних рецептов автора попадает в ленту при подписке.
+FEED_BACKFILL = int(os.getenv('FEED_BACKFILL', 100))
+
+# Время жизни списка покупок плана питания в кеше, секунды.
+MEAL_PLAN_CACHE_TIMEOUT = int(os.getenv('MEAL_PLAN_CACHE_TIMEOUT', 3600))
+
+# Рецептов в одной пачке потоковой выгрузки /api/recipes/export/.
+EXPORT_CHUNK_SIZE = int(os.getenv('EXPORT_CHUNK_SIZE', 500))
+
+# Ограничения изображения рецепта: размер файла в байтах и число пикселей.
+IMAGE_UPLOAD_MAX_SIZE = int(
+    os.getenv('IMAGE_UPLOAD_MAX_SIZE', 10 * 1024 * 1024)
+)
+IMAGE_UPLOAD_MAX_PIXELS = int(os.getenv('IMAGE_UPLOAD_MAX_PIXELS', 40000000))
+# Тело запроса без файлов: в JSON изображение передаётся в base64.
+DATA_UPLOAD_MAX_MEMORY_SIZE = IMAGE_UPLOAD_MAX_SIZE * 4 // 3 + 1024 * 1024
+
+# Хранилище корзин ограничения частоты запросов: CacheBucketStore -
+# общий кеш, LocalBucketStore - память процесса.
+THROTTLE_STORE = os.getenv(
+    'THROTTLE_STORE', 'api_foodgram.throttling.CacheBucketStore'
+)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -113,9 +211,15 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 STATIC_ROOT = BASE_DIR / 'collected_static'
+STATICFILES_STORAGE = (
+    'api_foodgram.storage.CompressedManifestStaticFilesStorage'
+)
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+# Внутренний location nginx для X-Accel-Redirect, например /protected/.
+# Если не задан, закрытые файлы отдаёт Django.
+PROTECTED_MEDIA_URL = os.getenv('PROTECTED_MEDIA_URL', '')
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
@@ -128,11 +232,34 @@ REST_FRAMEWORK = {
     ),
 
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
+        'api_foodgram.authentication.CachedTokenAuthentication',
+    ),
+
+    'DEFAULT_RENDERER_CLASSES': (
+        'api_foodgram.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+
+    'DEFAULT_PARSER_CLASSES': (
+        'api_foodgram.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'api_foodgram.parsers.JSONMultiPartParser',
     ),
 
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 6,
+
+    'DEFAULT_THROTTLE_CLASSES': (
+        'api_foodgram.throttling.ScopedBucketThrottle',
+    ),
+    # Пустое значение отключает ограничение области.
+    'DEFAULT_THROTTLE_RATES': {
+        'download': os.getenv('THROTTLE_RATE_DOWNLOAD', '10/min'),
+        'recipe_write': os.getenv('THROTTLE_RATE_RECIPE_WRITE', '30/min'),
+        'search': os.getenv('THROTTLE_RATE_SEARCH', '120/min'),
+    },
+    # Адрес клиента берётся из X-Forwarded-For от nginx.
+    'NUM_PROXIES': int(os.getenv('NUM_PROXIES', 1)),
 }
 
 DJOSER = {
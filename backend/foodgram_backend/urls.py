@@ -3,9 +3,12 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
+from api_foodgram.instrumentation import metrics_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('api_foodgram.urls')),
+    path('metrics/', metrics_view),
 ]
 
 if settings.DEBUG:
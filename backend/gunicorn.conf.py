@@ -0,0 +1,70 @@
+"""
+Профиль gunicorn для backend.
+
+Число воркеров и потоков выводится из доступных контейнеру CPU,
+каждое значение можно переопределить переменной окружения GUNICORN_*.
+"""
+import math
+import os
+
+
+def get_cpu_count():
+    """Число CPU с учётом привязки процесса и квоты cgroup v2."""
+    if hasattr(os, 'sched_getaffinity'):
+        count = len(os.sched_getaffinity(0))
+    else:
+        count = os.cpu_count() or 1
+    try:
+        with open('/sys/fs/cgroup/cpu.max') as file:
+            quota, period = file.read().split()
+    except (OSError, ValueError):
+        return count
+    if quota == 'max':
+        return count
+    return max(1, min(count, math.ceil(int(quota) / int(period))))
+
+
+cpu_count = get_cpu_count()
+
+wsgi_app = os.getenv('GUNICORN_APP', 'foodgram_backend.wsgi')
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8080')
+# gthread: запросы ждут БД в потоках, а не занимают процесс целиком.
+# Для ASGI: GUNICORN_WORKER_CLASS=uvicorn.workers.UvicornWorker
+# и GUNICORN_APP=foodgram_backend.asgi. Потоковые выгрузки рецептов
+# под ASGI отвечают 501, для них нужны WSGI-воркеры.
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+workers = int(os.getenv('GUNICORN_WORKERS') or cpu_count * 2 + 1)
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+# Django и зависимости импортируются один раз в мастере до fork.
+preload_app = os.getenv('GUNICORN_PRELOAD', default='True') == 'True'
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+# Перезапуск воркера после заданного числа запросов, 0 - без перезапуска.
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 0))
+warmup = os.getenv('GUNICORN_WARMUP', default='True') == 'True'
+
+
+def on_starting(server):
+    # Метрики воркеров прошлого запуска в новые счётчики не входят.
+    directory = os.getenv('METRICS_DIR')
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        for name in os.listdir(directory):
+            if name.endswith('.json'):
+                os.remove(os.path.join(directory, name))
+
+
+def when_ready(server):
+    if warmup and server.cfg.preload_app:
+        from api_foodgram.warmup import prepare
+
+        prepare()
+
+
+def post_worker_init(worker):
+    if warmup:
+        from api_foodgram.warmup import warm_up
+
+        warm_up()
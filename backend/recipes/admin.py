@@ -1,27 +1,80 @@
 from django.contrib import admin
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.forms.models import BaseInlineFormSet
 
-from .models import Cart, Favorite, Ingredient, IngredientAmount, Recipe, Tag
+from api_foodgram.paginations import EstimatedCountAdminMixin
+from .models import (Cart, Favorite, Ingredient, IngredientAmount, MealPlan,
+                     Recipe, Tag)
+
+# Сколько рецептов с ингредиентом показывается на его странице.
+INGREDIENT_RECIPES_LIMIT = 20
 
 
 class IngredientAmountInline(admin.TabularInline):
     model = IngredientAmount
     extra = 1
+    autocomplete_fields = ('ingredients',)
+
+    def get_queryset(self, request):
+        # Строка формы выводит рецепт и ингредиент в __str__.
+        return super().get_queryset(request).select_related(
+            'recipe', 'ingredients',
+        )
+
+
+class IngredientRecipesFormSet(BaseInlineFormSet):
+
+    def get_queryset(self):
+        # Ингредиент может входить в тысячи рецептов.
+        if not hasattr(self, '_limited_queryset'):
+            self._limited_queryset = list(
+                super().get_queryset().order_by('-id')[
+                    :INGREDIENT_RECIPES_LIMIT
+                ]
+            )
+        return self._limited_queryset
+
+
+class IngredientRecipesInline(admin.TabularInline):
+    """Последние рецепты с ингредиентом, только для просмотра."""
+    model = IngredientAmount
+    formset = IngredientRecipesFormSet
+    fields = ('recipe', 'amount')
+    readonly_fields = ('recipe', 'amount')
+    extra = 0
+    can_delete = False
+    verbose_name_plural = (
+        f'Последние {INGREDIENT_RECIPES_LIMIT} рецептов с ингредиентом'
+    )
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related(
+            'recipe', 'ingredients',
+        )
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
 
 
 @admin.register(Ingredient)
-class IngredientAdmin(admin.ModelAdmin):
-    inlines = [IngredientAmountInline]
+class IngredientAdmin(EstimatedCountAdminMixin, admin.ModelAdmin):
+    inlines = [IngredientRecipesInline]
     list_display = (
         'id',
         'name',
         'measurement_unit',
     )
-    list_filter = ('name',)
-    search_fields = ('name',)
+    list_filter = ('measurement_unit',)
+    search_fields = ('^name',)
+    ordering = ('name',)
 
 
 @admin.register(Recipe)
-class RecipeAdmin(admin.ModelAdmin):
+class RecipeAdmin(EstimatedCountAdminMixin, admin.ModelAdmin):
     inlines = [IngredientAmountInline]
     list_display = (
         'id',
@@ -30,15 +83,35 @@ class RecipeAdmin(admin.ModelAdmin):
         'pub_date',
         'in_favorite',
     )
-    list_filter = ('name', 'author', 'tags')
-    search_fields = ('name', 'author', 'tags')
+    list_select_related = ('author',)
+    list_filter = ('tags',)
+    search_fields = ('^name', '=author__email', '=author__username')
+    autocomplete_fields = ('author', 'tags')
 
+    def get_queryset(self, request):
+        # Подзапрос выполняется только для строк текущей страницы.
+        return super().get_queryset(request).annotate(
+            favorites_count=Coalesce(Subquery(
+                Favorite.objects.filter(recipe=OuterRef('pk')).values(
+                    'recipe',
+                ).annotate(count=Count('id')).values('count'),
+                output_field=IntegerField(),
+            ), 0),
+        )
+
+    @admin.display(description='В избранном', ordering='favorites_count')
     def in_favorite(self, obj):
-        return obj.favorite.count()
+        return obj.favorites_count
+
+    def save_model(self, request, obj, form, change):
+        if change:
+            # Правка в админке тоже меняет ETag рецепта.
+            obj.version += 1
+        super().save_model(request, obj, form, change)
 
 
 @admin.register(Tag)
-class TadAdmin(admin.ModelAdmin):
+class TadAdmin(EstimatedCountAdminMixin, admin.ModelAdmin):
     list_display = (
         'id',
         'name',
@@ -48,18 +121,34 @@ class TadAdmin(admin.ModelAdmin):
 
 
 @admin.register(Favorite)
-class FavoriteAdmin(admin.ModelAdmin):
+class FavoriteAdmin(EstimatedCountAdminMixin, admin.ModelAdmin):
     list_display = (
         'author',
         'recipe',
     )
-    search_fields = ('author', 'recipe',)
+    list_select_related = ('author', 'recipe')
+    search_fields = ('=author__email', '^recipe__name',)
+    autocomplete_fields = ('author', 'recipe')
 
 
 @admin.register(Cart)
-class CartAdmin(admin.ModelAdmin):
+class CartAdmin(EstimatedCountAdminMixin, admin.ModelAdmin):
     list_display = (
         'author',
         'recipe',
     )
-    search_fields = ('author', 'recipe',)
+    list_select_related = ('author', 'recipe')
+    search_fields = ('=author__email', '^recipe__name',)
+    autocomplete_fields = ('author', 'recipe')
+
+
+@admin.register(MealPlan)
+class MealPlanAdmin(EstimatedCountAdminMixin, admin.ModelAdmin):
+    list_display = (
+        'id',
+        'name',
+        'author',
+    )
+    list_select_related = ('author',)
+    search_fields = ('^name', '=author__email',)
+    autocomplete_fields = ('author',)
@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.models import SimilarRecipe
+from recipes.similarity import build_similar_recipes
+
+
+class Command(BaseCommand):
+    """
+    Команда полного пересчёта похожих рецептов.
+    Между запусками списки обновляются при сохранении рецепта.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top', type=int, default=settings.SIMILAR_RECIPES_COUNT,
+            help='Похожих рецептов на рецепт.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Рецептов, обрабатываемых за один шаг.',
+        )
+
+    def handle(self, *args, **options):
+        created = 0
+        with transaction.atomic():
+            SimilarRecipe.objects.all().delete()
+            for batch in build_similar_recipes(
+                options['top'], options['batch_size'],
+            ):
+                SimilarRecipe.objects.bulk_create(
+                    SimilarRecipe(
+                        recipe_id=recipe_id, similar_id=similar_id,
+                        score=score,
+                    )
+                    for recipe_id, similar_id, score in batch
+                )
+                created += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано связей похожих рецептов: {created}.'
+        ))
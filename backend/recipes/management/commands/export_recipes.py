@@ -0,0 +1,31 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from api_foodgram.transfer import BATCH_SIZE, WORKERS, export_recipes
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    """ Команда экспорта всех рецептов в JSONL-файл для резервной копии."""
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл JSONL, - для stdout.')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument(
+            '--workers', type=int, default=WORKERS,
+            help='Потоков для чтения изображений.',
+        )
+
+    def handle(self, *args, **options):
+        lines = export_recipes(
+            Recipe.objects.all(), options['batch_size'], options['workers'],
+        )
+        if options['path'] == '-':
+            sys.stdout.buffer.writelines(lines)
+            return
+        with open(options['path'], 'wb') as file:
+            file.writelines(lines)
+        self.stdout.write(self.style.SUCCESS(
+            f'Рецепты выгружены в {options["path"]}.'
+        ))
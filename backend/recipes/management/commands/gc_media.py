@@ -0,0 +1,71 @@
+import posixpath
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api_foodgram.downloads import SHOPPING_LIST_DIR
+from recipes.models import Recipe
+
+
+def list_files(storage, directory):
+    if not storage.exists(directory):
+        return []
+    _, files = storage.listdir(directory)
+    return [(storage, posixpath.join(directory, name)) for name in files]
+
+
+class Command(BaseCommand):
+    """
+    Команда удаления неиспользуемых файлов: изображений, на которые
+    не ссылается ни один рецепт, и старых списков покупок.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-age', type=int, default=60,
+            help='Не трогать файлы моложе заданного числа минут.',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только вывести файлы, которые будут удалены.',
+        )
+
+    def handle(self, *args, **options):
+        field = Recipe._meta.get_field('image')
+        # Файл мог быть сохранён в транзакции, которая ещё не завершена.
+        threshold = timezone.now() - timedelta(minutes=options['min_age'])
+
+        referenced = set(
+            Recipe.objects.values_list('image', flat=True).iterator()
+        )
+        garbage = [
+            (storage, name)
+            for storage, name in list_files(
+                field.storage, field.upload_to.rstrip('/')
+            )
+            if name not in referenced
+        ]
+        # Списки покупок создаются заново при скачивании.
+        garbage.extend(list_files(default_storage, SHOPPING_LIST_DIR))
+
+        removed = 0
+        for storage, name in garbage:
+            if storage.get_modified_time(name) > threshold:
+                continue
+            # Пока шёл обход, новый рецепт мог сослаться на то же
+            # изображение: одинаковые файлы используются совместно.
+            if storage is field.storage and Recipe.objects.filter(
+                image=name,
+            ).exists():
+                continue
+            if options['dry_run']:
+                self.stdout.write(name)
+            else:
+                storage.delete(name)
+            removed += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Неиспользуемых файлов: {removed}.'
+        ))
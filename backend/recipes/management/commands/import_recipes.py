@@ -0,0 +1,50 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api_foodgram.transfer import BATCH_SIZE, WORKERS, RecipeImporter
+from users.models import User
+
+
+class Command(BaseCommand):
+    """
+    Команда импорта рецептов из JSONL-файла, который создаёт
+    export_recipes. После импорта нужно заполнить ленты и похожие
+    рецепты командами rebuild_feed и build_similar_recipes.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл JSONL, - для stdin.')
+        parser.add_argument(
+            '--author',
+            help='Email автора для рецептов, в которых он не указан.',
+        )
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument(
+            '--workers', type=int, default=WORKERS,
+            help='Потоков для обработки изображений.',
+        )
+
+    def handle(self, *args, **options):
+        author = None
+        if options['author']:
+            author = User.objects.filter(email=options['author']).first()
+            if author is None:
+                raise CommandError(
+                    f'Пользователь {options["author"]} не найден.'
+                )
+        importer = RecipeImporter(
+            author, options['batch_size'], options['workers'],
+        )
+        if options['path'] == '-':
+            importer.run(sys.stdin.buffer)
+        else:
+            with open(options['path'], 'rb') as file:
+                importer.run(file)
+
+        for number, error in sorted(importer.errors):
+            self.stderr.write(f'Строка {number}: {error}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Импортировано рецептов: {importer.created}, '
+            f'пропущено строк: {len(importer.errors)}.'
+        ))
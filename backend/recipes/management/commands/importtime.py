@@ -0,0 +1,64 @@
+import os
+import subprocess
+import sys
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# То же, что делает воркер gunicorn при запуске.
+BOOT = (
+    'import django; django.setup(); '
+    'from foodgram_backend.wsgi import application; '
+    'import foodgram_backend.urls'
+)
+
+
+def run_boot(*options):
+    """Запускает загрузку приложения в отдельном процессе."""
+    return subprocess.run(
+        (sys.executable, *options, '-c', BOOT), cwd=settings.BASE_DIR,
+        env={**os.environ, 'DJANGO_SETTINGS_MODULE': settings.SETTINGS_MODULE},
+        stderr=subprocess.PIPE, text=True, check=True,
+    )
+
+
+def get_import_times():
+    """
+    Время импорта модулей при загрузке по отчёту python -X importtime:
+    словарь имя модуля -> (собственное время, с вложенными), мкс.
+    """
+    times = {}
+    for line in run_boot('-X', 'importtime').stderr.splitlines():
+        if not line.startswith('import time:') or '[us]' in line:
+            continue
+        own, cumulative, name = line[len('import time:'):].split('|')
+        times[name.strip()] = (int(own), int(cumulative))
+    return times
+
+
+class Command(BaseCommand):
+    """
+    Команда отчёта о времени импорта при запуске приложения:
+    пакеты, которые дольше всего загружаются в каждом воркере.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top', type=int, default=20,
+            help='Число пакетов в отчёте.',
+        )
+
+    def handle(self, *args, **options):
+        times = get_import_times()
+        packages = Counter()
+        for name, (own, _) in times.items():
+            packages[name.split('.')[0]] += own
+
+        self.stdout.write(f'{"Пакет":32} {"мс":>8}')
+        for package, own in packages.most_common(options['top']):
+            self.stdout.write(f'{package:32} {own / 1000:8.1f}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Модулей: {len(times)}, '
+            f'время импорта: {sum(packages.values()) / 1000:.1f} мс.'
+        ))
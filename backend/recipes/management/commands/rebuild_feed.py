@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api_foodgram.feed import rebuild_feed
+
+
+class Command(BaseCommand):
+    """
+    Команда заполнения лент подписок по текущим подпискам.
+    Нужна после импорта данных или перехода на FEED_STRATEGY=inbox.
+    """
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            created = rebuild_feed()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано записей лент: {created}.'
+        ))
@@ -0,0 +1,178 @@
+import random
+from base64 import b64decode
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.models import (Cart, Favorite, Ingredient, IngredientAmount,
+                            Recipe, Tag)
+from users.models import Follow, User
+
+IMAGE_NAME = 'recipes/images/seed.png'
+IMAGE = (
+    'iVBORw0KGgoAAAANSUhEUgAAAAEAAAABAgMAAABieywaAAAACVBMVEUAAAD///9fX1/S0ec'
+    'CAAAACXBIWXMAAA7EAAAOxAGVKw4bAAAACklEQVQImWNoAAAAggCByxOyYQAAAABJRU5Erk'
+    'Jggg=='
+)
+TAGS = (
+    ('Завтрак', '#E26C2D', 'breakfast'),
+    ('Обед', '#49B64E', 'lunch'),
+    ('Ужин', '#8775D2', 'dinner'),
+    ('Десерт', '#F7D046', 'dessert'),
+    ('Выпечка', '#C56DB1', 'bakery'),
+)
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    """
+    Команда заполнения БД синтетическими данными для бенчмарков.
+    Все объекты создаются через bulk_create.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument(
+            '--recipes', type=int, default=10,
+            help='Рецептов на пользователя.',
+        )
+        parser.add_argument(
+            '--ingredients', type=int, default=6,
+            help='Среднее число ингредиентов в рецепте.',
+        )
+        parser.add_argument(
+            '--favorites', type=int, default=20,
+            help='Избранных рецептов на пользователя.',
+        )
+        parser.add_argument(
+            '--cart', type=int, default=5,
+            help='Рецептов в списке покупок на пользователя.',
+        )
+        parser.add_argument(
+            '--follows', type=int, default=10,
+            help='Подписок на пользователя.',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        if not Ingredient.objects.exists():
+            call_command('import_data', stdout=self.stdout)
+        with transaction.atomic():
+            tags = self.create_tags()
+            users = self.create_users(options['users'])
+            recipes = self.create_recipes(rng, users, options['recipes'])
+            self.create_recipe_links(
+                rng, recipes, tags, options['ingredients']
+            )
+            self.create_user_links(rng, users, recipes, options)
+        if not default_storage.exists(IMAGE_NAME):
+            default_storage.save(IMAGE_NAME, ContentFile(b64decode(IMAGE)))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано пользователей: {len(users)}, '
+            f'рецептов: {len(recipes)}.'
+        ))
+
+    def create_tags(self):
+        Tag.objects.bulk_create(
+            [Tag(name=name, color=color, slug=slug)
+             for name, color, slug in TAGS],
+            ignore_conflicts=True,
+        )
+        return list(Tag.objects.all())
+
+    def create_users(self, count):
+        start = User.objects.count()
+        password = make_password('password')
+        User.objects.bulk_create(
+            [
+                User(
+                    email=f'user{index}@example.org',
+                    username=f'user{index}',
+                    first_name=f'Имя{index}',
+                    last_name=f'Фамилия{index}',
+                    password=password,
+                )
+                for index in range(start, start + count)
+            ],
+            batch_size=BATCH_SIZE,
+        )
+        return list(User.objects.order_by('-id')[:count])
+
+    def create_recipes(self, rng, users, per_user):
+        recipes = [
+            Recipe(
+                author=author,
+                name=f'Рецепт {author.username} №{index}',
+                image=IMAGE_NAME,
+                text='Описание рецепта. ' * rng.randint(5, 50),
+                cooking_time=rng.randint(1, 180),
+            )
+            for author in users
+            for index in range(per_user)
+        ]
+        Recipe.objects.bulk_create(recipes, batch_size=BATCH_SIZE)
+        return list(Recipe.objects.order_by('-id')[:len(recipes)])
+
+    def create_recipe_links(self, rng, recipes, tags, ingredients_count):
+        ingredient_ids = list(Ingredient.objects.values_list('id', flat=True))
+        # Популярность ингредиентов распределена по закону Ципфа.
+        weights = [1 / rank for rank in range(1, len(ingredient_ids) + 1)]
+        rng.shuffle(ingredient_ids)
+        tag_links = []
+        amounts = []
+        for recipe in recipes:
+            for tag in rng.sample(tags, rng.choice((1, 1, 2, 2, 3))):
+                tag_links.append(
+                    Recipe.tags.through(recipe_id=recipe.id, tag_id=tag.id)
+                )
+            count = max(1, int(rng.gauss(ingredients_count, 2)))
+            chosen = set(rng.choices(ingredient_ids, weights, k=count))
+            amounts.extend(
+                IngredientAmount(
+                    recipe_id=recipe.id,
+                    ingredients_id=ingredient_id,
+                    amount=rng.randint(1, 500),
+                )
+                for ingredient_id in chosen
+            )
+        Recipe.tags.through.objects.bulk_create(
+            tag_links, batch_size=BATCH_SIZE
+        )
+        IngredientAmount.objects.bulk_create(amounts, batch_size=BATCH_SIZE)
+
+    def create_user_links(self, rng, users, recipes, options):
+        favorites = []
+        carts = []
+        follows = []
+        for user in users:
+            favorites.extend(
+                Favorite(author_id=user.id, recipe_id=recipe.id)
+                for recipe in rng.sample(
+                    recipes, min(options['favorites'], len(recipes))
+                )
+            )
+            carts.extend(
+                Cart(author_id=user.id, recipe_id=recipe.id)
+                for recipe in rng.sample(
+                    recipes, min(options['cart'], len(recipes))
+                )
+            )
+            follows.extend(
+                Follow(follower_id=user.id, author_id=author.id)
+                for author in rng.sample(
+                    users, min(options['follows'], len(users))
+                )
+                if author.id != user.id
+            )
+        for model, objects in (
+            (Favorite, favorites), (Cart, carts), (Follow, follows),
+        ):
+            model.objects.bulk_create(
+                objects, batch_size=BATCH_SIZE, ignore_conflicts=True,
+            )
@@ -0,0 +1,65 @@
+# Generated by Django 3.2.3 on 2026-10-19 17:58
+
+from django.conf import settings
+import django.core.validators
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0013_recipe_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MealPlan',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=200, verbose_name='Название')),
+                ('version', models.PositiveIntegerField(default=1, editable=False, verbose_name='Версия')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='meal_plans', to=settings.AUTH_USER_MODEL, verbose_name='Владелец')),
+            ],
+            options={
+                'verbose_name': 'План питания',
+                'verbose_name_plural': 'Планы питания',
+                'ordering': ('-id',),
+            },
+        ),
+        migrations.CreateModel(
+            name='MealPlanDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Дата')),
+                ('plan', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='days', to='recipes.mealplan', verbose_name='План питания')),
+            ],
+            options={
+                'verbose_name': 'День плана питания',
+                'verbose_name_plural': 'Дни плана питания',
+                'ordering': ('date',),
+            },
+        ),
+        migrations.CreateModel(
+            name='MealPlanRecipe',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('servings', models.PositiveSmallIntegerField(default=1, validators=[django.core.validators.MinValueValidator(limit_value=1, message='Число порций должно быть больше или равно 1.'), django.core.validators.MaxValueValidator(limit_value=100, message='Число порций должно быть не больше 100.')], verbose_name='Число порций')),
+                ('day', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recipes', to='recipes.mealplanday', verbose_name='День плана')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='planned', to='recipes.recipe', verbose_name='Рецепт')),
+            ],
+            options={
+                'verbose_name': 'Рецепт в плане питания',
+                'verbose_name_plural': 'Рецепты в плане питания',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='mealplanrecipe',
+            constraint=models.UniqueConstraint(fields=('day', 'recipe'), name='unique_day_recipe'),
+        ),
+        migrations.AddConstraint(
+            model_name='mealplanday',
+            constraint=models.UniqueConstraint(fields=('plan', 'date'), name='unique_plan_date'),
+        ),
+    ]
@@ -3,6 +3,7 @@ from django.db import models
 from colorfield.fields import ColorField
 
 from users.models import User
+from .storage import ContentAddressedStorage
 
 
 class Tag(models.Model):
@@ -71,6 +72,7 @@ class Recipe(models.Model):
     image = models.ImageField(
         verbose_name='Фото блюда',
         upload_to='recipes/images/',
+        storage=ContentAddressedStorage(),
     )
     text = models.TextField(
         verbose_name='Описание рецепта',
@@ -105,11 +107,23 @@ class Recipe(models.Model):
         verbose_name='Дата публикации',
         auto_now_add=True
     )
+    # Увеличивается при каждом изменении, из неё строится ETag.
+    version = models.PositiveIntegerField(
+        verbose_name='Версия',
+        default=1,
+        editable=False,
+    )
 
     class Meta:
         ordering = ('-pub_date',)
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
+        indexes = [
+            models.Index(
+                fields=['author', '-pub_date'],
+                name='recipe_author_pub_date_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -197,3 +211,172 @@ class Cart(models.Model):
 
     def __str__(self):
         return f'{self.recipe} в списке покупок у {self.author}'
+
+
+class SimilarRecipe(models.Model):
+    """ Модель похожего рецепта, заполняется из recipes.similarity."""
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='similar',
+        verbose_name='Рецепт'
+    )
+    similar = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='similar_to',
+        verbose_name='Похожий рецепт'
+    )
+    score = models.FloatField(
+        verbose_name='Сходство',
+    )
+
+    class Meta:
+        ordering = ('-score',)
+        verbose_name_plural = 'Похожие рецепты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipe', 'similar'],
+                name='unique_similar_recipe',
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.similar} похож на {self.recipe}'
+
+
+class FeedItem(models.Model):
+    """ Модель записи ленты: рецепт автора, на которого подписан юзер."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed',
+        verbose_name='Подписчик'
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='feed_items',
+        verbose_name='Рецепт'
+    )
+    pub_date = models.DateTimeField(
+        verbose_name='Дата публикации рецепта',
+    )
+
+    class Meta:
+        ordering = ('-pub_date',)
+        verbose_name_plural = 'Ленты подписок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'],
+                name='unique_feed_recipe',
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date'],
+                name='feed_user_pub_date_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.recipe} в ленте у {self.user}'
+
+
+class MealPlan(models.Model):
+    """ Модель плана питания на несколько недель."""
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='meal_plans',
+        verbose_name='Владелец'
+    )
+    name = models.CharField(
+        verbose_name='Название',
+        max_length=200,
+    )
+    # Увеличивается при изменении рецептов в плане,
+    # по ней проверяется кеш списка покупок плана.
+    version = models.PositiveIntegerField(
+        verbose_name='Версия',
+        default=1,
+        editable=False,
+    )
+
+    class Meta:
+        ordering = ('-id',)
+        verbose_name = 'План питания'
+        verbose_name_plural = 'Планы питания'
+
+    def __str__(self):
+        return self.name
+
+
+class MealPlanDay(models.Model):
+    """ Модель дня плана питания."""
+    plan = models.ForeignKey(
+        MealPlan,
+        on_delete=models.CASCADE,
+        related_name='days',
+        verbose_name='План питания'
+    )
+    date = models.DateField(
+        verbose_name='Дата',
+    )
+
+    class Meta:
+        ordering = ('date',)
+        verbose_name = 'День плана питания'
+        verbose_name_plural = 'Дни плана питания'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['plan', 'date'],
+                name='unique_plan_date',
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.date} в плане {self.plan}'
+
+
+class MealPlanRecipe(models.Model):
+    """ Модель рецепта в дне плана питания."""
+    day = models.ForeignKey(
+        MealPlanDay,
+        on_delete=models.CASCADE,
+        related_name='recipes',
+        verbose_name='День плана'
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='planned',
+        verbose_name='Рецепт'
+    )
+    servings = models.PositiveSmallIntegerField(
+        verbose_name='Число порций',
+        default=1,
+        validators=(
+            MinValueValidator(
+                limit_value=1,
+                message='Число порций должно быть больше или равно 1.'
+            ),
+            MaxValueValidator(
+                limit_value=100,
+                message='Число порций должно быть не больше 100.'
+            ),
+        )
+    )
+
+    class Meta:
+        verbose_name = 'Рецепт в плане питания'
+        verbose_name_plural = 'Рецепты в плане питания'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['day', 'recipe'],
+                name='unique_day_recipe',
+            )
+        ]
+
+    def __str__(self):
+        return f'{self.recipe} на {self.day.date}'
@@ -0,0 +1,242 @@
+"""
+Похожие рецепты: коэффициент Жаккара по множествам ингредиентов и тегов.
+Похожими считаются рецепты хотя бы с одним общим ингредиентом.
+"""
+import logging
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.db.models import (Count, ExpressionWrapper, FloatField,
+                              IntegerField, OuterRef, Q, Subquery, Value)
+from django.db.models.functions import Cast, Coalesce
+
+from .models import IngredientAmount, Recipe, SimilarRecipe
+
+# Сколько самых похожих рецептов проверяется на добавление
+# пересчитанного рецепта в их списки.
+CANDIDATES = 200
+
+RecipeTag = Recipe.tags.through
+
+logger = logging.getLogger(__name__)
+
+
+def count_tags(tag_ids=None):
+    if tag_ids is not None and not tag_ids:
+        # Пустой IN сделал бы пустым весь запрос, а не подзапрос.
+        return Value(0)
+    tags = RecipeTag.objects.filter(recipe_id=OuterRef('pk'))
+    if tag_ids is not None:
+        tags = tags.filter(tag_id__in=tag_ids)
+    return Coalesce(Subquery(
+        tags.values('recipe_id').annotate(count=Count('tag_id'))
+        .values('count'),
+        output_field=IntegerField(),
+    ), 0)
+
+
+def get_top(scores, top):
+    return sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:top]
+
+
+def get_features(recipe_id):
+    """Id ингредиентов и тегов рецепта."""
+    return (
+        set(IngredientAmount.objects.filter(
+            recipe_id=recipe_id,
+        ).values_list('ingredients_id', flat=True)),
+        set(RecipeTag.objects.filter(
+            recipe_id=recipe_id,
+        ).values_list('tag_id', flat=True)),
+    )
+
+
+def get_scores(recipe_id, ingredient_ids, tag_ids, limit):
+    """
+    Сходство рецепта со всеми рецептами с общими ингредиентами,
+    считает БД. Возвращает limit самых похожих: {id: сходство}.
+    """
+    if not ingredient_ids:
+        return {}
+    shared = (
+        Count('am_ingredients', filter=Q(
+            am_ingredients__ingredients_id__in=ingredient_ids,
+        )) + count_tags(tag_ids)
+    )
+    return dict(
+        Recipe.objects.filter(
+            id__in=IngredientAmount.objects.filter(
+                ingredients_id__in=ingredient_ids,
+            ).values('recipe_id'),
+        ).exclude(id=recipe_id).annotate(score=ExpressionWrapper(
+            Cast(shared, FloatField()) / (
+                len(ingredient_ids) + len(tag_ids)
+                + Count('am_ingredients') + count_tags() - shared
+            ),
+            output_field=FloatField(),
+        )).order_by('-score', 'id').values_list('id', 'score')[:limit]
+    )
+
+
+def refill_similar_recipes(recipe_ids, top):
+    """Заново считает списки рецептов, из которых удалён похожий."""
+    objects = []
+    for recipe_id in recipe_ids:
+        scores = get_scores(recipe_id, *get_features(recipe_id), top)
+        objects.extend(
+            SimilarRecipe(
+                recipe_id=recipe_id, similar_id=other_id, score=score,
+            )
+            for other_id, score in scores.items()
+        )
+    SimilarRecipe.objects.filter(recipe_id__in=recipe_ids).delete()
+    SimilarRecipe.objects.bulk_create(objects, ignore_conflicts=True)
+
+
+def update_similar_recipes(recipe_id, ingredient_ids=None, tag_ids=None):
+    """
+    Пересчитывает похожие рецепты для одного рецепта, добавляет его
+    в списки тех рецептов, в топ которых он теперь попадает, и заново
+    считает списки, из которых он выпал. Известные вызывающему id
+    ингредиентов и тегов можно передать вместе.
+    """
+    top = settings.SIMILAR_RECIPES_COUNT
+    if ingredient_ids is None or tag_ids is None:
+        ingredient_ids, tag_ids = get_features(recipe_id)
+    scores = get_scores(
+        recipe_id, set(ingredient_ids), set(tag_ids), CANDIDATES,
+    )
+
+    with transaction.atomic():
+        # Рецепты, в списках которых он был, и прежнее сходство с ними.
+        holders = {}
+        neighbors = defaultdict(list)
+        for similar in SimilarRecipe.objects.filter(
+            Q(recipe_id__in=scores) | Q(similar_id=recipe_id),
+        ).only('id', 'recipe_id', 'similar_id', 'score'):
+            if similar.similar_id == recipe_id:
+                holders[similar.recipe_id] = similar.score
+            else:
+                neighbors[similar.recipe_id].append(similar)
+        SimilarRecipe.objects.filter(
+            Q(recipe_id=recipe_id) | Q(similar_id=recipe_id)
+        ).delete()
+
+        objects = [
+            SimilarRecipe(
+                recipe_id=recipe_id, similar_id=other_id, score=score,
+            )
+            for other_id, score in get_top(scores, top)
+        ]
+        evicted = []
+        for other_id, score in scores.items():
+            # Если сходство упало, рецепт может уступить место тому,
+            # кого нет в списке, такой список считается заново.
+            if score < holders.get(other_id, score):
+                continue
+            if len(neighbors[other_id]) >= top:
+                # Порядок как в build_similar_recipes: сходство, затем id.
+                lowest = max(
+                    neighbors[other_id],
+                    key=lambda similar: (-similar.score, similar.similar_id),
+                )
+                if (-score, recipe_id) > (-lowest.score, lowest.similar_id):
+                    continue
+                evicted.append(lowest.id)
+            objects.append(SimilarRecipe(
+                recipe_id=other_id, similar_id=recipe_id, score=score,
+            ))
+            holders.pop(other_id, None)
+        if evicted:
+            SimilarRecipe.objects.filter(id__in=evicted).delete()
+        # Параллельная правка соседнего рецепта могла добавить ту же пару.
+        SimilarRecipe.objects.bulk_create(objects, ignore_conflicts=True)
+        if holders:
+            refill_similar_recipes(holders, top)
+
+
+def schedule_similar_update(recipe_id, ingredient_ids, tag_ids):
+    """
+    Пересчитывает похожие рецепты после фиксации транзакции рецепта.
+    Ошибка пересчёта не отменяет сохранённый рецепт: она пишется
+    в лог, а списки восстановит команда build_similar_recipes.
+    """
+    def update():
+        try:
+            update_similar_recipes(recipe_id, ingredient_ids, tag_ids)
+        except DatabaseError:
+            logger.exception(
+                'Не удалось пересчитать похожие рецепты для %s', recipe_id,
+            )
+
+    transaction.on_commit(update)
+
+
+def get_matrix(recipe_ids, pairs):
+    """
+    Разреженная матрица рецепт x признак из пар (id рецепта, id признака).
+    """
+    import numpy as np
+    from scipy import sparse
+
+    pairs = np.array(list(pairs), dtype=np.int64).reshape(-1, 2)
+    rows = np.searchsorted(recipe_ids, pairs[:, 0])
+    features, columns = np.unique(pairs[:, 1], return_inverse=True)
+    matrix = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.int32), (rows, columns)),
+        shape=(len(recipe_ids), len(features)),
+    )
+    # Повторяющиеся пары складываются, нужна только принадлежность.
+    matrix.data[:] = 1
+    return matrix
+
+
+def build_similar_recipes(top, batch_size):
+    """
+    Похожие рецепты для всех рецептов, по batch_size рецептов за шаг.
+    Общие ингредиенты считаются произведением разреженных матриц.
+    Возвращает списки кортежей (id рецепта, id похожего, сходство).
+    """
+    import numpy as np
+
+    recipe_ids = np.fromiter(
+        Recipe.objects.order_by('id').values_list('id', flat=True)
+        .iterator(),
+        dtype=np.int64,
+    )
+    ingredients = get_matrix(
+        recipe_ids,
+        IngredientAmount.objects.values_list('recipe_id', 'ingredients_id')
+        .iterator(),
+    )
+    # Тегов мало, поэтому их матрица плотная.
+    tags = get_matrix(
+        recipe_ids,
+        RecipeTag.objects.values_list('recipe_id', 'tag_id').iterator(),
+    ).toarray().astype(bool)
+    sizes = np.asarray(ingredients.sum(axis=1)).ravel() + tags.sum(axis=1)
+    transposed = ingredients.T.tocsr()
+
+    for start in range(0, len(recipe_ids), batch_size):
+        shared = (ingredients[start:start + batch_size] @ transposed).tocoo()
+        rows = shared.row + start
+        columns = shared.col
+        other = rows != columns
+        rows, columns = rows[other], columns[other]
+        counts = shared.data[other] + (tags[rows] & tags[columns]).sum(axis=1)
+        scores = counts / (sizes[rows] + sizes[columns] - counts)
+
+        order = np.lexsort((columns, -scores, rows))
+        rows, columns, scores = rows[order], columns[order], scores[order]
+        # Номер похожего рецепта внутри строки после сортировки.
+        starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+        ranks = np.arange(len(rows)) - np.repeat(
+            starts, np.diff(np.r_[starts, len(rows)])
+        )
+        best = ranks < top
+        yield list(zip(
+            recipe_ids[rows[best]].tolist(),
+            recipe_ids[columns[best]].tolist(),
+            scores[best].tolist(),
+        ))
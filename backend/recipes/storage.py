@@ -0,0 +1,42 @@
+import hashlib
+import os
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+def get_content_name(name, content):
+    """Имя файла из sha256 содержимого с расширением исходного имени."""
+    digest = hashlib.sha256()
+    for chunk in content.chunks():
+        digest.update(chunk)
+    directory, filename = os.path.split(name)
+    extension = os.path.splitext(filename)[1].lower()
+    return os.path.join(directory, digest.hexdigest() + extension)
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Хранилище, в котором файл называется по хешу содержимого.
+    Одинаковые файлы записываются один раз и используются совместно,
+    поэтому удалять их можно только командой gc_media.
+    """
+
+    def reuse(self, name):
+        """
+        Обновляет время изменения существующего файла, чтобы gc_media
+        считал его новым, пока рецепт с ним не сохранён. Возвращает
+        False, если файла нет.
+        """
+        try:
+            os.utime(self.path(name))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def save(self, name, content, max_length=None):
+        name = get_content_name(name, content)
+        if self.reuse(name):
+            return name
+        return super().save(name, content, max_length)
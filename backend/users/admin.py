@@ -2,11 +2,12 @@ from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django.contrib.admin import register
 
+from api_foodgram.paginations import EstimatedCountAdminMixin
 from .models import Follow, User
 
 
 @register(User)
-class UserAdmin(UserAdmin):
+class UserAdmin(EstimatedCountAdminMixin, UserAdmin):
     list_display = (
         'id',
         'email',
@@ -17,14 +18,16 @@ class UserAdmin(UserAdmin):
         'is_active',
         'date_joined',
     )
-    list_filter = ('email', 'username',)
-    search_fields = ('email', 'username',)
+    list_filter = ('is_staff', 'is_active',)
+    search_fields = ('^email', '^username',)
 
 
 @admin.register(Follow)
-class FollowAdmin(admin.ModelAdmin):
+class FollowAdmin(EstimatedCountAdminMixin, admin.ModelAdmin):
     list_display = (
         'follower',
         'author',
     )
-    search_fields = ('follower', 'author',)
+    list_select_related = ('follower', 'author')
+    search_fields = ('=follower__email', '=author__email',)
+    autocomplete_fields = ('follower', 'author')